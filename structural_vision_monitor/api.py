@@ -106,6 +106,27 @@ def _frame_generator():
         time.sleep(1.0 / 30)
 
 
+@app.get("/pipeline_stats")
+def get_pipeline_stats():
+    """Per-stage throughput of the decode → track pipeline."""
+    stats = live_processor.get_pipeline_stats()
+    if stats is None:
+        return JSONResponse(content={"status": "not running"})
+    return JSONResponse(content=stats)
+
+
+@app.get("/profile")
+def get_profile():
+    """Per-stage timing histograms, feature counts and RANSAC inlier ratios."""
+    return JSONResponse(content=live_processor.get_profile())
+
+
+@app.post("/profile")
+def set_profile(enabled: bool = Query(True), reset: bool = Query(False)):
+    """Enable / disable live stage timing (optionally clearing past samples)."""
+    return {"enabled": live_processor.set_profiling(enabled, reset=reset)}
+
+
 # ---------------------------------------------------------------------------
 # Spectral Analysis
 # ---------------------------------------------------------------------------
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the tracking pipeline.
+
+Run from the ``structural_vision_monitor`` directory, e.g.::
+
+    python -m benchmarks.parallel_speedup --video data/test_video.mp4
+"""
@@ -0,0 +1,34 @@
+"""
+Dense flow engine benchmark
+===========================
+Compares the sparse LK corner tracker with the dense-flow engine
+(``DenseFlowTracker``) at a few presets, scales and sensor sizes on the
+synthetic ground-truth videos, then times each engine alone on a real
+clip.  The "flow ms" column is the per-frame cost of LK for the sparse
+engine and of the dense flow field for the dense one.
+
+    python -m benchmarks.dense_flow --cases clean slow-heavy
+"""
+
+from benchmarks.tracker_suite import compare_configs, config_parser
+
+
+# label: tracker keyword arguments ("engine" selects the class)
+CONFIGS = {
+    "sparse LK": dict(),
+    "DIS fast 1/2": dict(engine="dense"),
+    "DIS ultrafast": dict(engine="dense", dense_preset="ultrafast"),
+    "DIS fast 1/4": dict(engine="dense", dense_scale=0.25),
+    "DIS fast 16px": dict(engine="dense", dense_cell=16),
+    "Farneback 1/2": dict(engine="dense", dense_method="farneback"),
+}
+
+
+def main():
+    args = config_parser("Dense flow engine benchmark",
+                         default_cases=["clean", "noise", "slow-heavy"]).parse_args()
+    compare_configs(CONFIGS, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Forward-backward check benchmark
+================================
+Compares tracker configurations on the synthetic ground-truth videos:
+the default, the forward-backward LK check alone, and the check combined
+with a lower RANSAC iteration cap and corner budget (plus that lean setup
+without the check, to show what the check buys).  Reports end-to-end
+frames/s next to frequency and damping error so a speed-up is only
+taken when accuracy holds, then times the tracker alone on a real clip,
+where outliers (and so RANSAC cost) are far more common than in the
+synthetic scenes.
+
+    python -m benchmarks.fb_check --cases shake shake+noise --duration 20
+"""
+
+from benchmarks.tracker_suite import compare_configs, config_parser
+
+
+# label: VibrationTracker keyword arguments
+CONFIGS = {
+    "default": dict(),
+    "fb": dict(fb_threshold=1.0),
+    "fb + lean": dict(fb_threshold=1.0, ransac_max_iters=200, max_corners=200),
+    "lean, no fb": dict(ransac_max_iters=200, max_corners=200),
+}
+
+
+def main():
+    args = config_parser("Forward-backward LK check benchmark",
+                         default_cases=["shake", "shake+noise"]).parse_args()
+    compare_configs(CONFIGS, args)
+
+
+if __name__ == "__main__":
+    main()
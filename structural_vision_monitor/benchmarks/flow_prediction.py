@@ -0,0 +1,30 @@
+"""
+Predicted initial flow benchmark
+================================
+Measures what seeding LK with each track's constant-velocity prediction
+(``VibrationTracker(predict_flow=True)``) saves per frame, and whether the
+shallower pyramid / fewer iterations it allows cost any accuracy on the
+synthetic ground-truth videos.
+
+    python -m benchmarks.flow_prediction --cases clean shake fast-light
+"""
+
+from benchmarks.tracker_suite import compare_configs, config_parser
+
+
+# label: VibrationTracker keyword arguments
+CONFIGS = {
+    "default": dict(),
+    "predicted": dict(predict_flow=True),
+    "predicted + fb": dict(predict_flow=True, fb_threshold=1.0),
+}
+
+
+def main():
+    args = config_parser("Predicted initial flow benchmark",
+                         default_cases=["clean", "shake", "fast-light"]).parse_args()
+    compare_configs(CONFIGS, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Camera-motion model benchmark
+=============================
+Compares the camera-motion models of ``motion_models.py`` (and the prior /
+subsampling shortcuts) on the synthetic ground-truth videos, where the
+camera shake is a pure translation, and on a real clip.  Reports the
+per-frame cost of the motion fit next to frequency and damping error.
+The "all pts" rows fit on structure and background points together
+instead of the background alone (``motion_points``).
+
+    python -m benchmarks.motion_model --cases shake shake+noise
+"""
+
+from benchmarks.tracker_suite import compare_configs, config_parser
+
+
+# label: VibrationTracker keyword arguments
+CONFIGS = {
+    "homography": dict(),
+    "similarity": dict(motion_model="similarity"),
+    "auto": dict(motion_model="auto"),
+    "auto + prior": dict(motion_model="auto", motion_prior=True),
+    "auto + sub 100": dict(motion_model="auto", motion_prior=True, motion_subsample=100),
+    "homog., all pts": dict(motion_points="all"),
+    "auto+pr, all pts": dict(motion_model="auto", motion_prior=True, motion_points="all"),
+}
+
+
+def main():
+    args = config_parser("Camera-motion model benchmark",
+                         default_cases=["shake", "shake+noise", "slow-heavy"]).parse_args()
+    compare_configs(CONFIGS, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Parallel tracking speedup benchmark
+===================================
+Times a serial VibrationTracker pass against ParallelVibrationTracker with
+an increasing number of worker processes, and checks that the stitched
+displacements match the serial ones.
+
+    python -m benchmarks.parallel_speedup --video long_recording.mp4 --workers 1 2 4 8
+
+Speedup is only meaningful on a video with many more frames than
+``workers * chunk_frames``; on short clips process start-up dominates.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from feature_tracker import VibrationTracker
+from parallel_tracking import ParallelVibrationTracker
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Parallel tracking speedup benchmark")
+    p.add_argument("--video", default="data/test_video.mp4")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--chunk-frames", type=int, default=600)
+    return p.parse_args()
+
+
+def _timed(tracker):
+    t0 = time.perf_counter()
+    displacements, _ = tracker.run()
+    return displacements, time.perf_counter() - t0
+
+
+def main():
+    args = parse_args()
+    print(f"CPU cores: {os.cpu_count()}")
+
+    reference, t_serial = _timed(VibrationTracker(args.video))
+    print(f"serial     : {t_serial:8.2f} s  ({len(reference) / t_serial:7.1f} fps)")
+
+    for workers in args.workers:
+        tracker = ParallelVibrationTracker(args.video, workers=workers,
+                                           chunk_frames=args.chunk_frames)
+        displacements, elapsed = _timed(tracker)
+        identical = len(displacements) == len(reference) and all(
+            np.array_equal(a, b) for a, b in zip(displacements, reference)
+        )
+        print(f"workers={workers:<3}: {elapsed:8.2f} s  "
+              f"({len(displacements) / elapsed:7.1f} fps)  "
+              f"speedup x{t_serial / elapsed:5.2f}  "
+              f"efficiency {t_serial / elapsed / workers:6.1%}  "
+              f"matches serial: {identical}")
+
+
+if __name__ == "__main__":
+    main()
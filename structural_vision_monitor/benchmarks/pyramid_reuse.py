@@ -0,0 +1,118 @@
+"""
+Optical-flow pyramid reuse benchmark
+====================================
+``calcOpticalFlowPyrLK`` builds the image pyramid of both frames on every
+call, so each frame's pyramid is built twice: once as "next" and again as
+"prev" on the following frame.  This benchmark measures, on frames that
+are already decoded:
+
+- the per-frame cost of the current raw-image call (VibrationTracker's
+  lk_params and feature_params),
+- the cost of the pyramid construction that reuse would save,
+- the per-frame cost when prebuilt pyramids are carried forward, if the
+  installed OpenCV bindings accept pyramids as input.
+
+    python -m benchmarks.pyramid_reuse --video data/test_video.mp4 --frames 300
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from feature_tracker import VibrationTracker
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Optical-flow pyramid reuse benchmark")
+    p.add_argument("--video", default="data/test_video.mp4")
+    p.add_argument("--frames", type=int, default=300)
+    return p.parse_args()
+
+
+def load_gray_frames(video_path, n_frames):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    if len(frames) < 2:
+        raise ValueError(f"Need at least 2 frames from {video_path}")
+    return frames
+
+
+def build_pyramid(gray, lk_params, with_derivatives):
+    _, pyramid = cv2.buildOpticalFlowPyramid(
+        gray, lk_params["winSize"], lk_params["maxLevel"],
+        withDerivatives=with_derivatives,
+    )
+    return pyramid
+
+
+def time_raw(frames, p0, lk_params):
+    t0 = time.perf_counter()
+    for prev, nxt in zip(frames, frames[1:]):
+        cv2.calcOpticalFlowPyrLK(prev, nxt, p0, None, **lk_params)
+    return (time.perf_counter() - t0) / (len(frames) - 1)
+
+
+def time_pyramid_build(frames, lk_params, with_derivatives):
+    t0 = time.perf_counter()
+    for gray in frames:
+        build_pyramid(gray, lk_params, with_derivatives)
+    return (time.perf_counter() - t0) / len(frames)
+
+
+def time_reused(frames, p0, lk_params):
+    """Per-frame cost with each pyramid built once and carried forward."""
+    t0 = time.perf_counter()
+    prev_pyr = build_pyramid(frames[0], lk_params, True)
+    for nxt in frames[1:]:
+        next_pyr = build_pyramid(nxt, lk_params, True)
+        cv2.calcOpticalFlowPyrLK(list(prev_pyr), list(next_pyr), p0, None, **lk_params)
+        prev_pyr = next_pyr
+    return (time.perf_counter() - t0) / (len(frames) - 1)
+
+
+def pyramid_input_supported(frames, p0, lk_params):
+    try:
+        pyr = list(build_pyramid(frames[0], lk_params, True))
+        cv2.calcOpticalFlowPyrLK(pyr, pyr, p0, None, **lk_params)
+        return True
+    except cv2.error:
+        return False
+
+
+def main():
+    args = parse_args()
+    tracker = VibrationTracker(args.video)
+    frames = load_gray_frames(args.video, args.frames)
+    p0 = cv2.goodFeaturesToTrack(frames[0], mask=None, **tracker.feature_params)
+    lk = tracker.lk_params
+
+    raw = time_raw(frames, p0, lk)
+    pyr_plain = time_pyramid_build(frames, lk, with_derivatives=False)
+    pyr_deriv = time_pyramid_build(frames, lk, with_derivatives=True)
+
+    print(f"OpenCV {cv2.__version__}, {len(frames)} frames "
+          f"{frames[0].shape[1]}x{frames[0].shape[0]}, {len(p0)} features")
+    print(f"LK, raw images (before)       : {raw * 1e3:7.3f} ms/frame")
+    print(f"  pyramid build               : {pyr_plain * 1e3:7.3f} ms/frame")
+    print(f"  pyramid build + derivatives : {pyr_deriv * 1e3:7.3f} ms/frame")
+    print(f"  redundant share (upper bound): {np.clip(pyr_plain / raw, 0, 1):6.1%}")
+
+    if pyramid_input_supported(frames, p0, lk):
+        reused = time_reused(frames, p0, lk)
+        print(f"LK, reused pyramids (after)   : {reused * 1e3:7.3f} ms/frame  "
+              f"speedup x{raw / reused:.2f}")
+    else:
+        print("LK, reused pyramids (after)   : not available — these OpenCV "
+              "Python bindings only accept single images for prevImg/nextImg")
+
+
+if __name__ == "__main__":
+    main()
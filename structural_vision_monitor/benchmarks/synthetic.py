@@ -0,0 +1,150 @@
+"""
+Synthetic ground-truth videos
+=============================
+Renders a textured beam oscillating vertically as a damped free decay of
+known frequency, amplitude and damping ratio, over a static textured
+background.  Optional camera shake (whole-frame sub-pixel translation)
+and sensor noise make the scene harder for the tracker.
+
+    python -m benchmarks.synthetic --out synthetic.mp4 --freq 2.5 --damping 0.02
+
+The returned ``SyntheticVideo`` carries the ground truth and the beam
+rectangle to pass to ``main.py --roi`` (with ``--roi-crop`` so the
+background band constrains the camera-motion homography).
+"""
+
+import argparse
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+SyntheticVideo = namedtuple(
+    "SyntheticVideo",
+    ["path", "fps", "n_frames", "freq", "damping", "amplitude", "roi", "displacement"],
+)
+SyntheticVideo.__doc__ = """
+path         : str    written video file
+fps          : float
+n_frames     : int
+freq         : float  undamped natural frequency (Hz)
+damping      : float  viscous damping ratio ζ
+amplitude    : float  initial beam amplitude (px)
+roi          : tuple  (x, y, w, h) of the beam at rest
+displacement : np.ndarray  (n_frames,) true vertical beam displacement (px)
+"""
+
+
+def damped_response(n_frames, fps, freq, damping, amplitude, onset=0.5):
+    """Free decay y(t) = A·exp(-ζωt)·cos(ω_d t) starting ``onset`` seconds in."""
+    t = np.arange(n_frames) / fps - onset
+    omega = 2 * np.pi * freq
+    omega_d = omega * np.sqrt(1 - damping ** 2)
+    y = amplitude * np.exp(-damping * omega * t) * np.cos(omega_d * t)
+    y[t < 0] = 0.0
+    return y
+
+
+def _texture(rng, shape, blur=1.5):
+    """Random speckle texture with plenty of trackable corners."""
+    tex = rng.uniform(0, 255, size=shape).astype(np.float32)
+    tex = cv2.GaussianBlur(tex, (0, 0), blur)
+    tex -= tex.min()
+    return tex * (255.0 / max(float(tex.max()), 1e-6))
+
+
+def _shift(img, dx, dy, border=cv2.BORDER_REFLECT):
+    m = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(img, m, (img.shape[1], img.shape[0]),
+                          flags=cv2.INTER_LINEAR, borderMode=border)
+
+
+def generate(path, duration=10.0, fps=30.0, size=(640, 360), freq=2.0, damping=0.02,
+             amplitude=3.0, shake=0.0, noise=0.0, seed=0):
+    """
+    Write a synthetic vibration video and return its ``SyntheticVideo``.
+
+    Parameters
+    ----------
+    path : str
+        Output file (``.mp4``, written with the mp4v codec).
+    duration, fps : float
+        Clip length in seconds and frame rate.
+    size : tuple
+        (width, height) in pixels.
+    freq, damping, amplitude : float
+        Ground truth of the beam's free decay (Hz, ζ, px).
+    shake : float
+        Standard deviation (px) of the camera's random-walk translation.
+    noise : float
+        Standard deviation of additive Gaussian sensor noise (grey levels).
+    seed : int
+        Seed for textures, shake and noise.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    n_frames = int(round(duration * fps))
+    displacement = damped_response(n_frames, fps, freq, damping, amplitude)
+
+    background = _texture(rng, (height, width), blur=2.5) * 0.6
+    bx, bw = width // 6, width * 2 // 3
+    bh = height // 5
+    by = (height - bh) // 2
+    # Taller than the beam so vertical shifts never expose its edge
+    beam = _texture(rng, (bh + 4 * int(np.ceil(amplitude)) + 8, bw)) * 0.8 + 40
+    margin = (beam.shape[0] - bh) // 2
+
+    shake_xy = np.zeros((n_frames, 2))
+    if shake > 0:
+        walk = np.cumsum(rng.normal(0, shake * 0.3, size=(n_frames, 2)), axis=0)
+        shake_xy = np.clip(walk - walk.mean(axis=0), -4 * shake, 4 * shake)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"Cannot open video writer: {path}")
+    try:
+        for i in range(n_frames):
+            frame = background.copy()
+            moved = _shift(beam, 0.0, displacement[i])
+            frame[by : by + bh, bx : bx + bw] = moved[margin : margin + bh]
+            if shake > 0:
+                frame = _shift(frame, *shake_xy[i])
+            if noise > 0:
+                frame = frame + rng.normal(0, noise, size=frame.shape)
+            gray = np.clip(frame, 0, 255).astype(np.uint8)
+            writer.write(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    finally:
+        writer.release()
+
+    return SyntheticVideo(path, fps, n_frames, freq, damping, amplitude,
+                          (bx, by, bw, bh), displacement)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Synthetic vibration video generator")
+    p.add_argument("--out", default="synthetic.mp4")
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    p.add_argument("--freq", type=float, default=2.0)
+    p.add_argument("--damping", type=float, default=0.02)
+    p.add_argument("--amplitude", type=float, default=3.0)
+    p.add_argument("--shake", type=float, default=0.0)
+    p.add_argument("--noise", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=0)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    video = generate(args.out, duration=args.duration, fps=args.fps, size=tuple(args.size),
+                     freq=args.freq, damping=args.damping, amplitude=args.amplitude,
+                     shake=args.shake, noise=args.noise, seed=args.seed)
+    x, y, w, h = video.roi
+    print(f"Wrote {video.path}: {video.n_frames} frames @ {video.fps:.1f} fps")
+    print(f"Analyse with: python main.py --video {video.path} --roi {x} {y} {w} {h} --roi-crop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Template engine benchmark
+=========================
+Compares the sparse LK corner tracker with the phase-correlation template
+engine (``TemplateTracker``) at a few patch counts and sizes on the
+synthetic ground-truth videos, then times each alone on a real clip.
+Render the synthetic cases at a high frame rate (``--fps 240``) to see
+the regime the template engine is meant for.
+
+    python -m benchmarks.template_engine --cases clean fast-light --fps 240 --duration 4
+"""
+
+from benchmarks.tracker_suite import compare_configs, config_parser
+
+
+# label: tracker keyword arguments ("engine" selects the class)
+CONFIGS = {
+    "sparse LK": dict(),
+    "16 × 64px": dict(engine="template"),
+    "8 × 64px": dict(engine="template", template_count=8),
+    "16 × 32px": dict(engine="template", template_size=32),
+    "32 × 32px": dict(engine="template", template_count=32, template_size=32),
+}
+
+
+def main():
+    args = config_parser("Phase-correlation template engine benchmark",
+                         default_cases=["clean", "noise", "slow-heavy"]).parse_args()
+    compare_configs(CONFIGS, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Tracker accuracy / throughput suite
+===================================
+Generates synthetic videos with known vibration (see ``synthetic.py``),
+runs the full ``main.py`` pipeline on each, and reports frames/sec, peak
+memory, and the error of the recovered frequency and damping ratio, so a
+speed-up can be checked for accuracy regressions in the same run.
+
+    python -m benchmarks.tracker_suite
+    python -m benchmarks.tracker_suite --cases clean shake --duration 30 -- --queue-depth 0
+
+Arguments after ``--`` are passed through to ``main.py``.  Each case runs
+in a fresh process so the peak-RSS figure belongs to that case alone.
+
+``compare_configs`` runs the same cases under several tracker
+configurations; the per-feature benchmarks (``fb_check``,
+``flow_prediction``, ``motion_model``, ``dense_flow``, ``template_engine``)
+are built on it.
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import generate
+from feature_tracker import ENGINES
+from profiling import StageProfiler
+
+
+# name: generate() overrides
+CASES = {
+    "clean": dict(),
+    "shake": dict(shake=0.5),
+    "noise": dict(noise=4.0),
+    "shake+noise": dict(shake=0.5, noise=4.0),
+    "fast-light": dict(freq=5.0, damping=0.01, amplitude=1.5),
+    "slow-heavy": dict(freq=1.5, damping=0.05, amplitude=4.0, shake=0.3),
+}
+
+# VibrationTracker keyword -> main.py flag, for configs given as tracker kwargs
+TRACKER_FLAGS = {
+    "fb_threshold": "--fb-threshold",
+    "ransac_max_iters": "--ransac-iters",
+    "max_corners": "--max-corners",
+    "predict_flow": "--predict-flow",
+    "motion_model": "--motion-model",
+    "motion_subsample": "--motion-subsample",
+    "motion_prior": "--motion-prior",
+    "motion_points": "--motion-points",
+    "engine": "--engine",
+    "dense_method": "--dense-method",
+    "dense_preset": "--dense-preset",
+    "dense_scale": "--dense-scale",
+    "dense_cell": "--dense-cell",
+    "template_size": "--template-size",
+    "template_count": "--template-count",
+}
+
+# Per-frame motion-measurement stage of each engine
+FLOW_STAGES = ("lk_flow", "dense_flow", "phase_correlate")
+
+
+def main_args_for(config):
+    """main.py arguments reproducing a dict of VibrationTracker kwargs."""
+    argv = []
+    for key, value in config.items():
+        if value is True:
+            argv.append(TRACKER_FLAGS[key])
+        elif value is not False and value is not None:
+            argv += [TRACKER_FLAGS[key], str(value)]
+    return argv
+
+
+def parse_args():
+    argv = sys.argv[1:]
+    passthrough = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, passthrough = argv[:split], argv[split + 1:]
+    p = argparse.ArgumentParser(description="Synthetic tracker accuracy / throughput suite")
+    p.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    p.add_argument("--duration", type=float, default=10.0, help="Seconds per video")
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    p.add_argument("--workdir", default=None,
+                   help="Keep videos and results here (default: a temporary directory)")
+    args = p.parse_args(argv)
+    args.main_args = passthrough
+    return args
+
+
+def _run_case(argv):
+    """Worker: run main.main(argv) quietly, return (results, seconds, peak RSS MiB)."""
+    import main as pipeline
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = pipeline.main(argv)
+    elapsed = time.perf_counter() - t0
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return results, elapsed, peak_mib
+
+
+def make_video(name, workdir, args):
+    """Render case ``name`` into ``workdir``; returns its SyntheticVideo."""
+    return generate(os.path.join(workdir, f"{name}.mp4"), duration=args.duration,
+                    fps=args.fps, size=tuple(args.size), **CASES[name])
+
+
+def run_pipeline(video, results_dir, main_args=()):
+    """
+    Run main.py on a synthetic video in a fresh process and score it.
+
+    Returns
+    -------
+    dict with fps (end-to-end frames/s), peak_mib, freq_err (relative,
+    Welch peak) and damping_err (absolute, None if not estimated).
+    """
+    x, y, w, h = video.roi
+    argv = [
+        "--video", video.path,
+        "--results", results_dir,
+        "--roi", str(x), str(y), str(w), str(h), "--roi-crop",
+        "--no-cache",
+    ] + list(main_args)
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        results, elapsed, peak_mib = pool.submit(_run_case, argv).result()
+
+    damping = results["damping"]
+    return {
+        "fps": results["frames"] / elapsed,
+        "peak_mib": peak_mib,
+        "freq_err": abs(results["dom_freq_psd"] - video.freq) / video.freq,
+        "damping_err": abs(damping - video.damping) if damping is not None else None,
+    }
+
+
+def config_parser(description, default_cases):
+    """Argument parser shared by the configuration-comparison benchmarks."""
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--cases", nargs="+", default=default_cases, choices=list(CASES))
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    p.add_argument("--video", default="data/test_video.mp4",
+                   help="Real clip for the tracker-only timing ('' to skip)")
+    return p
+
+
+def compare_configs(configs, args):
+    """
+    Score each {label: VibrationTracker kwargs} config on the synthetic cases
+    through main.py, then time the tracker alone on ``args.video`` with the
+    per-frame flow (LK, dense or phase correlation) and camera-motion costs taken from a
+    StageProfiler.  An ``engine`` key selects the tracker class (ENGINES).
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'case':<13} {'config':<16} {'fps':>8} {'freq err':>9} {'ζ err':>8}")
+        for name in args.cases:
+            video = make_video(name, workdir, args)
+            for label, config in configs.items():
+                r = run_pipeline(video, os.path.join(workdir, "results"), main_args_for(config))
+                zeta = f"{r['damping_err']:8.4f}" if r["damping_err"] is not None else "     N/A"
+                print(f"{name:<13} {label:<16} {r['fps']:8.1f} {r['freq_err']:9.2%} {zeta}")
+
+    if args.video:
+        print(f"\nTracker only on {args.video}:")
+        print(f"  {'config':<16} {'fps':>8} {'flow ms':>12} {'motion ms':>10} "
+              f"{'features':>9}")
+        for label, config in configs.items():
+            profiler = StageProfiler()
+            kwargs = dict(config)
+            tracker_cls = ENGINES[kwargs.pop("engine", "sparse")]
+            tracker = tracker_cls(args.video, profiler=profiler, **kwargs)
+            t0 = time.perf_counter()
+            n_frames = sum(1 for _ in tracker.iter_frames())
+            elapsed = time.perf_counter() - t0
+            summary = profiler.summary()
+            stages = summary["stages"]
+            flow = next(stages[k] for k in FLOW_STAGES if k in stages)
+            flow_ms = flow["mean_ms"]
+            motion_ms = summary["stages"]["motion_fit"]["mean_ms"]
+            features = summary["values"]["features"]["mean"]
+            print(f"  {label:<16} {n_frames / elapsed:8.1f} {flow_ms:12.3f} {motion_ms:10.3f} "
+                  f"{features:9.1f}")
+
+
+def main():
+    args = parse_args()
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(workdir, exist_ok=True)
+
+        print(f"{'case':<13} {'fps':>8} {'peak MiB':>9} {'freq err':>9} {'ζ err':>8}")
+        for name in args.cases:
+            video = make_video(name, workdir, args)
+            r = run_pipeline(video, os.path.join(workdir, f"{name}_results"), args.main_args)
+            zeta = f"{r['damping_err']:8.4f}" if r["damping_err"] is not None else "     N/A"
+            print(f"{name:<13} {r['fps']:8.1f} {r['peak_mib']:9.1f} "
+                  f"{r['freq_err']:9.2%} {zeta}")
+
+
+if __name__ == "__main__":
+    main()
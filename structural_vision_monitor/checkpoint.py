@@ -0,0 +1,171 @@
+"""
+Tracking Checkpoints — Resume interrupted offline runs
+======================================================
+``ResumableTracker`` appends every tracked frame to an on-disk frame log
+(see ``tracking_cache.FrameLogWriter``) and, every ``interval`` frames,
+atomically writes the tracker's state next to it: the last frame index,
+the live track points / labels / ids / velocities, the last grayscale
+frame and the replenishment targets.
+
+After a crash, the log is truncated back to the last checkpoint,
+replayed from memory-mapped files, and tracking continues from the saved
+state with the same output as an uninterrupted run.  Only the frames
+since the last checkpoint are tracked again.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from feature_tracker import TrackerOutputs
+from tracking_cache import CACHE_VERSION, FrameLogReader, FrameLogWriter
+
+
+STATE_FILE = "state.npz"
+
+
+class TrackingCheckpoint:
+    """Frame log plus the latest tracker state in one directory."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def state_path(self):
+        return os.path.join(self.path, STATE_FILE)
+
+    def exists(self):
+        return os.path.exists(self.state_path)
+
+    def load(self):
+        """Return the saved checkpoint as a dict, or None."""
+        if not self.exists():
+            return None
+        with np.load(self.state_path) as data:
+            meta = json.loads(str(data["meta"]))
+            state = {
+                "index": meta["index"],
+                "next_id": meta["next_id"],
+                "cell_targets": {
+                    int(k): data[f"cell_targets_{k}"] for k in meta["cell_targets"]
+                },
+            }
+            for name in meta["arrays"]:
+                state[name] = data[name]
+        meta["state"] = state
+        return meta
+
+    def clear(self):
+        """Forget any saved state (the frame log is overwritten separately)."""
+        if self.exists():
+            os.remove(self.state_path)
+
+    def save(self, state, meta):
+        """Atomically replace the saved state (``meta`` must be JSON-serializable)."""
+        targets = state["cell_targets"]
+        arrays = {k: v for k, v in state.items() if isinstance(v, np.ndarray)}
+        meta = dict(meta, index=int(state["index"]), next_id=int(state["next_id"]),
+                    cell_targets=[int(k) for k in targets], arrays=list(arrays))
+        arrays.update({f"cell_targets_{k}": v for k, v in targets.items()})
+        tmp = self.state_path + ".tmp.npz"
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, self.state_path)
+
+
+class ResumableTracker(TrackerOutputs):
+    """
+    Wraps a ``VibrationTracker`` so that ``iter_frames`` writes periodic
+    checkpoints and, with ``resume=True``, continues from the last one.
+    Exposes the wrapped tracker's streaming interface.
+    """
+
+    def __init__(self, tracker, checkpoint_dir, interval=1800, resume=False):
+        """
+        Parameters
+        ----------
+        tracker : VibrationTracker
+        checkpoint_dir : str
+            Directory for the frame log and state file.
+        interval : int
+            Frames between checkpoints.
+        resume : bool
+            Continue from an existing checkpoint in ``checkpoint_dir``
+            (starts fresh if there is none).
+        """
+        self.tracker = tracker
+        self.checkpoint = TrackingCheckpoint(checkpoint_dir)
+        self.interval = interval
+        self.resume = resume
+        self.resumed_frames = 0
+        self.fps = None
+
+    @property
+    def video_path(self):
+        return self.tracker.video_path
+
+    @property
+    def roi_names(self):
+        return self.tracker.roi_names
+
+    @property
+    def pipeline_stats(self):
+        return self.tracker.pipeline_stats
+
+    def cache_key_params(self):
+        return self.tracker.cache_key_params()
+
+    def iter_frames(self):
+        # Lists keep their order through JSON, so reordered ROIs (whose
+        # labels the log and state index by position) are a mismatch
+        params = json.loads(json.dumps(
+            dict(self.tracker.cache_key_params(), video=os.path.abspath(self.video_path),
+                 video_bytes=os.path.getsize(self.video_path), log_version=CACHE_VERSION,
+                 roi_names=list(self.roi_names)),
+            default=repr,
+        ))
+        saved = self.checkpoint.load() if self.resume else None
+        if saved is not None and saved["params"] != params:
+            raise ValueError(
+                f"Checkpoint in {self.checkpoint.path} was written for a different "
+                "video or tracker settings"
+            )
+
+        if saved is None:
+            self.checkpoint.clear()
+            writer = FrameLogWriter(self.checkpoint.path)
+            n_frames, state = 0, None
+        else:
+            # Replay what was already tracked, then pick up from the saved state
+            n_frames, state = saved["frames"], saved["state"]
+            self.resumed_frames = n_frames
+            self.fps = saved["fps"]
+            yield from FrameLogReader(self.checkpoint.path, n_frames).iter_frames()
+            if saved["complete"]:
+                return
+            writer = FrameLogWriter(self.checkpoint.path, lengths=saved["lengths"])
+
+        try:
+            for tracked in self.tracker.iter_frames(resume=state):
+                writer.append(tracked)
+                n_frames += 1
+                if n_frames % self.interval == 0:
+                    self._save(writer, n_frames, params, complete=False)
+                yield tracked
+            self.fps = self.tracker.fps
+            self._save(writer, n_frames, params, complete=True, fallback=state)
+        finally:
+            writer.close()
+
+    def _save(self, writer, n_frames, params, complete, fallback=None):
+        state = self.tracker.checkpoint_state() or fallback
+        if state is None:
+            return
+        writer.flush(sync=True)
+        self.checkpoint.save(state, {
+            "params": params,
+            "fps": self.tracker.fps,
+            "frames": n_frames,
+            "lengths": writer.lengths(),
+            "complete": complete,
+        })
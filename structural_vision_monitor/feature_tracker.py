@@ -1,18 +1,294 @@
+from collections import namedtuple
+
 import cv2
 import numpy as np
 
+from frame_pipeline import FrameReader
+from motion_models import MODELS, MOTION_MODELS, MotionFit, apply_model, estimate_motion
+from phase_correlation import PhaseCorrelator, select_patches
+from profiling import NULL_PROFILER
+from track_store import TrackStore
+
+
+TrackedFrame = namedtuple(
+    "TrackedFrame",
+    ["index", "displacements", "points", "labels", "ids", "errors", "timestamp", "absolute",
+     "inliers"],
+    defaults=(None, None, None),
+)
+TrackedFrame.__doc__ = """
+Per-frame tracking result.
+
+index         : int         frame number in the video (frame 0 is the reference)
+displacements : np.ndarray  (N_i, 2) camera-compensated (dx, dy) per feature
+points        : np.ndarray  (N_i, 2) feature positions in the current frame
+labels        : np.ndarray  (N_i,) index into ``VibrationTracker.roi_names``
+                            of the ROI each feature belongs to
+ids           : np.ndarray  (N_i,) stable track id of each feature
+errors        : np.ndarray  (N_i,) LK tracking error of each feature
+timestamp     : float or None  presentation time of the frame (s), None if unknown
+absolute      : np.ndarray  (N_i, 2) camera-compensated displacement of each feature
+                            since its track's anchor; tracks spawned later start
+                            at their ROI's current level, so the ROI keeps one
+                            continuous absolute displacement across re-detection
+inliers       : np.ndarray  (N_i,) bool, within the camera model's reprojection
+                            threshold when the model was fitted on these features
+                            (no ROI, or motion_points='all'); all True otherwise
+"""
+
+
+class _TrackSet:
+    """Per-feature arrays that are filtered and extended together."""
+
+    FIELDS = ("pts", "labels", "ids", "vel", "absolute")
+
+    def __init__(self, pts, labels, ids, vel, absolute):
+        self.pts = pts          # (N, 2) float32 positions in the tracked image
+        self.labels = labels    # (N,) ROI index, -1 for background band
+        self.ids = ids          # (N,) stable track id
+        self.vel = vel          # (N, 2) float32 filtered per-frame velocity
+        self.absolute = absolute  # (N, 2) float32 displacement since the anchor
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, keep):
+        return _TrackSet(*(getattr(self, f)[keep] for f in self.FIELDS))
+
+    def extend(self, other):
+        if len(other) == 0:
+            return self
+        return _TrackSet(*(
+            np.concatenate([getattr(self, f), getattr(other, f)]) for f in self.FIELDS
+        ))
+
+
+def replenish_features(gray, pts, rect, feature_params, targets=None, grid=(4, 4),
+                       min_fill=0.5, retry_every=10):
+    """
+    Detect new corners only in the grid cells of ``rect`` that lost tracks.
+
+    ``rect`` is split into a ``grid`` of cells. Each cell remembers how many
+    tracks it held at the last full detection (``targets``); once it drops
+    below ``min_fill`` of that, it is re-detected on its own sub-image,
+    masked around surviving points. Cells that never had texture are never
+    searched, and the cost scales with the area that actually lost features
+    instead of the frame.
+    A cell that stays short after a search (occluded, blurred) keeps its
+    target but is only searched again every ``retry_every`` calls.
+
+    Parameters
+    ----------
+    gray : np.ndarray
+        Current grayscale image.
+    pts : np.ndarray  (N, 2)
+        Surviving feature positions in ``gray`` coordinates.
+    rect : tuple
+        (x, y, w, h) region to keep populated.
+    feature_params : dict
+        goodFeaturesToTrack parameters.
+    targets : np.ndarray or None
+        Per-cell state as returned by the previous call; None initializes
+        the targets from ``pts`` without detecting anything.
+    retry_every : int
+        Calls to wait before searching a cell that came up short again.
+
+    Returns
+    -------
+    new_pts : np.ndarray  (M, 2) float32
+    targets : np.ndarray  (2, rows * cols) per-cell target counts and calls
+              left before a short cell is searched again
+    """
+    x, y, w, h = rect
+    rows, cols = grid
+    empty = np.empty((0, 2), dtype=np.float32)
+
+    pts = np.asarray(pts, dtype=np.float32).reshape(-1, 2)
+    counts = np.zeros(rows * cols, dtype=np.int64)
+    if w >= cols and h >= rows:
+        cx = np.floor((pts[:, 0] - x) * cols / w).astype(np.int64)
+        cy = np.floor((pts[:, 1] - y) * rows / h).astype(np.int64)
+        inside = (cx >= 0) & (cx < cols) & (cy >= 0) & (cy < rows)
+        counts = np.bincount(cy[inside] * cols + cx[inside], minlength=rows * cols)
+
+    if targets is None:
+        return empty, np.stack([counts, np.zeros_like(counts)])
+    targets = targets.copy()
+    target, wait = targets
+    np.subtract(wait, 1, out=wait, where=wait > 0)
+
+    # Never exceed the region budget, however tracks have redistributed
+    budget = feature_params["maxCorners"] - len(pts)
+    deficient = np.flatnonzero((counts < min_fill * target) & (wait == 0))
+    if len(deficient) == 0 or budget <= 0:
+        return empty, targets
+
+    min_dist = feature_params.get("minDistance", 7)
+    found = []
+    for cell in deficient:
+        r, c = divmod(int(cell), cols)
+        x0, x1 = x + c * w // cols, x + (c + 1) * w // cols
+        y0, y1 = y + r * h // rows, y + (r + 1) * h // rows
+
+        near = (
+            (pts[:, 0] > x0 - min_dist) & (pts[:, 0] < x1 + min_dist)
+            & (pts[:, 1] > y0 - min_dist) & (pts[:, 1] < y1 + min_dist)
+        )
+        mask = _exclusion_mask(
+            np.full((y1 - y0, x1 - x0), 255, dtype=np.uint8),
+            pts[near] - (x0, y0), min_dist,
+        )
+        wanted = int(min(target[cell] - counts[cell], budget))
+        if wanted <= 0:
+            break
+        params = dict(feature_params, maxCorners=wanted)
+        cell_pts = cv2.goodFeaturesToTrack(gray[y0:y1, x0:x1], mask=mask, **params)
+        n_found = 0 if cell_pts is None else len(cell_pts)
+        if n_found:
+            found.append(cell_pts.reshape(-1, 2) + np.float32((x0, y0)))
+            budget -= n_found
+        if counts[cell] + n_found < min_fill * target[cell]:
+            wait[cell] = retry_every
+
+    return (np.concatenate(found) if found else empty), targets
+
+
+def _exclusion_mask(mask, pts, radius):
+    """Zero ``mask`` within ``radius`` of each point (in-place) and return it."""
+    for px, py in np.asarray(pts).reshape(-1, 2):
+        cv2.circle(mask, (int(round(px)), int(round(py))), int(radius), 0, -1)
+    return mask
+
+
+def absolute_levels(labels, absolute):
+    """{label: (2,) median absolute displacement of the tracks with that label}."""
+    return {
+        int(k): np.median(absolute[labels == k], axis=0).astype(np.float32)
+        for k in np.unique(labels)
+    }
+
+
+def split_by_roi(tracked, names, full=False, absolute=False):
+    """
+    {roi name: (N_k, 2) displacements} for one ``TrackedFrame``; with
+    ``full`` each value is a (displacements, points, errors, inliers) tuple
+    instead, as ``compensate_motion`` takes for rotation and weighted
+    aggregation.
+    ``absolute`` takes the absolute displacements instead of the
+    frame-to-frame ones.
+    """
+    disp = tracked.absolute if absolute else tracked.displacements
+    split = {}
+    for k, name in enumerate(names):
+        mask = tracked.labels == k
+        if not full:
+            split[name] = disp[mask]
+        elif len(tracked.points) == len(tracked.labels):
+            split[name] = (disp[mask], tracked.points[mask], tracked.errors[mask],
+                           tracked.inliers[mask])
+        else:
+            # Tracking-lost placeholder frame: no positions or errors
+            split[name] = (disp[mask], None, None, None)
+    return split
+
+
+class TrackerOutputs:
+    """
+    ``run`` / ``run_tracks`` / ``iter_displacements`` / ``iter_roi_displacements``
+    built on a tracker's ``iter_frames()``, ``fps`` and ``roi_names``.  Shared by
+    VibrationTracker and the wrappers that stand in for it.
+    """
+
+    def run(self):
+        """
+        Track features across every frame and return per-frame displacement lists.
+
+        Materializes the whole video in memory; prefer ``iter_displacements()``
+        for long recordings.
+
+        Returns
+        -------
+        all_displacements : list of np.ndarray  shape (N_i, 2)
+            Raw (dx, dy) vectors for each tracked feature in frame i.
+        fps : float
+        """
+        all_displacements = list(self.iter_displacements())
+        return all_displacements, self.fps
+
+    def iter_displacements(self):
+        """
+        Generator yielding each frame's (N_i, 2) structural displacement array
+        as soon as it has been tracked.
+
+        ``self.fps`` is available once the first item has been produced.
+        """
+        for tracked in self.iter_frames():
+            yield tracked.displacements
+
+    def run_tracks(self, store=None):
+        """
+        Track the whole video into a ``TrackStore`` of per-feature histories.
+
+        Returns
+        -------
+        store : TrackStore  (``store.fps`` is set)
+        """
+        store = store if store is not None else TrackStore()
+        for _ in store.record(self.iter_frames()):
+            pass
+        store.fps = self.fps
+        return store
+
+    def run_rois(self):
+        """
+        Multi-ROI counterpart of ``run()``.
+
+        Returns
+        -------
+        displacements : dict  {roi name: list of np.ndarray  shape (N_i, 2)}
+        fps : float
+        """
+        displacements = {name: [] for name in self.roi_names}
+        for frame in self.iter_roi_displacements():
+            for name, disp in frame.items():
+                displacements[name].append(disp)
+        return displacements, self.fps
+
+    def iter_roi_displacements(self):
+        """
+        Generator yielding, per frame, a dict {roi name: (N_i, 2) array} from
+        a single decode pass.
+        """
+        names = self.roi_names
+        for tracked in self.iter_frames():
+            yield split_by_roi(tracked, names)
+
 
-class VibrationTracker:
+class VibrationTracker(TrackerOutputs):
     """
     Markerless optical-flow vibration tracker with:
     - Shi-Tomasi feature detection
     - Lucas-Kanade sparse optical flow
-    - Homography-based global camera motion removal
-    - Optional ROI for structure isolation
-    - Feature reinitialization on track loss
+    - Global camera motion removal (see motion_models.py), fitted on
+      background corners outside the ROI when one is set
+    - Optional ROI for structure isolation, with an ROI-crop mode that
+      only converts and tracks a padded sub-image
+    - Several named ROIs tracked in one decode pass with a shared camera-motion
+      model (selectable, see ``motion_model``)
+    - Feature reinitialization on track loss, or incremental per-cell
+      replenishment that keeps surviving tracks (and their ids)
+    - Decoding on a background thread (see frame_pipeline.FrameReader)
     """
 
-    def __init__(self, video_path, roi=None, reinit_interval=60):
+    def __init__(self, video_path, roi=None, reinit_interval=60,
+                 pipeline_depth=4, drop_policy="block", start_frame=0, end_frame=None,
+                 roi_crop=False, crop_padding=64, band_corners=100, rois=None,
+                 reinit_mode="full", replenish_interval=1, replenish_grid=(4, 4),
+                 replenish_min_fill=0.5, profiler=None, fb_threshold=None,
+                 ransac_max_iters=2000, max_corners=400, predict_flow=False,
+                 predict_gain=0.7, predict_max_level=1, predict_iters=10,
+                 motion_model="homography", motion_subsample=None, motion_prior=False,
+                 motion_points="background", stride=1):
         """
         Parameters
         ----------
@@ -23,13 +299,140 @@ class VibrationTracker:
             If None, the full frame is used (no separation of background).
         reinit_interval : int
             Re-detect features every N frames to recover from drift / track loss.
+        pipeline_depth : int
+            Frames decoded ahead on a background thread (0 = decode serially).
+        drop_policy : str
+            Queue overflow policy passed to FrameReader; 'block' is lossless.
+        start_frame, end_frame : int, int or None
+            Track only frames [start_frame, end_frame). Frame indices (and the
+            reinit schedule) stay relative to the start of the video.
+        roi_crop : bool
+            Convert and track only the ROI padded by ``crop_padding`` pixels
+            instead of the full frame. Output positions are mapped back to
+            full-frame coordinates.
+        crop_padding : int
+            Width of the background band kept around the ROI in crop mode.
+        band_corners : int
+            Max background corners detected outside every ROI (in the padded
+            band in crop mode, anywhere else in the frame otherwise).  They
+            are tracked for the camera-motion model only and never reported
+            as structural displacement.  0 disables background tracking.
+        rois : dict or None
+            {name: (x, y, w, h)} for several structural members in one view
+            (e.g. deck, pier, cable). All are tracked in one decode pass and
+            share one camera-motion model (``motion_model``); use
+            ``iter_roi_displacements()`` to get a stream per member.
+            Mutually exclusive with ``roi``.
+        reinit_mode : str
+            'full'      — drop all tracks and re-detect every ``reinit_interval``
+                          frames.
+            'replenish' — every ``replenish_interval`` frames, detect new
+                          corners only in ``replenish_grid`` cells holding less
+                          than ``replenish_min_fill`` of their count at the
+                          last full detection; a cell still short after a
+                          search is retried only every 10th time (see
+                          ``replenish_features``). Surviving tracks are
+                          never reset.
+        profiler : StageProfiler or None
+            Receives per-stage timings (decode, cvtColor, lk_flow, motion_fit,
+            motion_apply, ...) and per-frame feature counts and camera-motion
+            inlier ratios.  Disabled when None.
+        fb_threshold : float or None
+            Forward-backward check: each frame's tracks are also tracked back
+            to the previous frame in one batched LK call, and tracks whose
+            round trip misses their start by more than this many pixels are
+            dropped before RANSAC.  None disables the check.
+        ransac_max_iters : int
+            RANSAC iteration cap for the camera-motion fit.  With the
+            forward-backward check removing outliers up front, far fewer
+            iterations reach the same consensus.
+        max_corners : int
+            Corner budget per ROI for goodFeaturesToTrack.
+        predict_flow : bool
+            Seed LK (OPTFLOW_USE_INITIAL_FLOW) with each track's predicted
+            position from a per-point constant-velocity (alpha-beta) filter.
+            Starting close to the answer, LK runs with ``predict_max_level``
+            pyramid levels and ``predict_iters`` iterations instead of
+            ``lk_params``' 3 levels / 30 iterations.
+        predict_gain : float
+            Velocity gain β of the filter: v ← v + β·(measured − predicted).
+            1.0 uses the last measured velocity; lower values smooth it.
+        predict_max_level, predict_iters : int
+            LK pyramid depth and iteration cap used when predicting.
+        motion_model : str
+            Camera-motion model removed from the displacements: 'translation',
+            'similarity', 'affine', 'homography' or 'auto' (escalate from
+            translation only while too few points fit).
+        motion_subsample : int or None
+            Fit the camera motion on at most this many evenly spaced points
+            (it is still applied to all of them).
+        motion_prior : bool
+            Try the previous frame's model first; when it still explains
+            most points it is refined by least squares and RANSAC is skipped.
+        motion_points : str
+            Points the camera-motion model is fitted on when an ROI is set.
+            'background' — only the background corners (falling back to all
+                           points while fewer than 8 survive), so structural
+                           motion is not absorbed into the camera model.
+            'all'        — background and structure points together.
+            The model is applied to every point either way.
+        stride : int
+            Process only every stride-th frame for a fast preview pass; the
+            frames in between are skipped with ``cap.grab()`` (never
+            converted).  ``fps`` becomes the effective rate source_fps /
+            stride, so anything above its Nyquist frequency aliases (see
+            ``signal_analysis.aliasing_warning``).  Reinit/replenish
+            intervals count processed frames.
         """
+        if motion_model not in MOTION_MODELS:
+            raise ValueError(f"Unknown motion model: {motion_model}")
+        if stride < 1:
+            raise ValueError(f"Stride must be >= 1, got {stride}")
+        if motion_points not in ("background", "all"):
+            raise ValueError(f"Unknown motion points: {motion_points}")
+        if reinit_mode not in ("full", "replenish"):
+            raise ValueError(f"Unknown reinit mode: {reinit_mode}")
+        if roi is not None and rois:
+            raise ValueError("Pass either roi or rois, not both.")
         self.video_path = video_path
         self.roi = roi
         self.reinit_interval = reinit_interval
+        self.pipeline_depth = pipeline_depth
+        self.drop_policy = drop_policy
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.roi_crop = roi_crop
+        self.crop_padding = crop_padding
+        self.band_corners = band_corners
+        self.rois = rois
+        self.reinit_mode = reinit_mode
+        self.replenish_interval = replenish_interval
+        self.replenish_grid = replenish_grid
+        self.replenish_min_fill = replenish_min_fill
+        self.profiler = profiler or NULL_PROFILER
+        self.fb_threshold = fb_threshold
+        self.ransac_max_iters = ransac_max_iters
+        self.predict_flow = predict_flow
+        self.predict_gain = predict_gain
+        self.predict_max_level = predict_max_level
+        self.predict_iters = predict_iters
+        self.motion_model = motion_model
+        self.motion_subsample = motion_subsample
+        self.motion_prior = motion_prior
+        self.motion_points = motion_points
+        self.stride = stride
+        self._motion_prior = None
+        self._crop = None
+        self._next_id = 0
+        self._cell_targets = {}
+        self._anchors = {}         # label -> absolute level new tracks start from
+        self._state = None
+        self.fps = None            # effective rate of the yielded frames
+        self.source_fps = None
+        self.pipeline_stats = None
 
         self.feature_params = dict(
-            maxCorners=400,
+            maxCorners=max_corners,
             qualityLevel=0.01,
             minDistance=7,
             blockSize=7,
@@ -40,125 +443,906 @@ class VibrationTracker:
             maxLevel=3,
             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
         )
+        self.predicted_lk_params = dict(
+            self.lk_params,
+            maxLevel=predict_max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, predict_iters, 0.01),
+        )
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def run(self):
+    @property
+    def roi_names(self):
+        """Names of the tracked regions, indexed by ``TrackedFrame.labels``."""
+        return [name for name, _ in self._regions()]
+
+    def cache_key_params(self):
+        """Every setting that affects the tracked output (see tracking_cache.py)."""
+        return dict(
+            roi=self.roi,
+            # Ordered pairs: the key is sorted JSON, and labels index this order
+            rois=None if self.rois is None else [[name, list(rect)]
+                                                  for name, rect in self.rois.items()],
+            reinit_interval=self.reinit_interval,
+            reinit_mode=self.reinit_mode,
+            replenish_interval=self.replenish_interval,
+            replenish_grid=self.replenish_grid,
+            replenish_min_fill=self.replenish_min_fill,
+            drop_policy=self.drop_policy,
+            start_frame=self.start_frame,
+            end_frame=self.end_frame,
+            roi_crop=self.roi_crop,
+            crop_padding=self.crop_padding,
+            band_corners=self.band_corners,
+            fb_threshold=self.fb_threshold,
+            ransac_max_iters=self.ransac_max_iters,
+            predict_flow=self.predict_flow,
+            predict_gain=self.predict_gain,
+            motion_model=self.motion_model,
+            motion_subsample=self.motion_subsample,
+            motion_prior=self.motion_prior,
+            motion_points=self.motion_points,
+            stride=self.stride,
+            feature_params=self.feature_params,
+            predicted_lk_params=self.predicted_lk_params,
+            lk_params=self.lk_params,
+        )
+
+    def checkpoint_state(self):
         """
-        Track features across every frame and return per-frame displacement lists.
+        Snapshot of the tracking state after the most recently yielded frame.
 
-        Returns
-        -------
-        all_displacements : list of np.ndarray  shape (N_i, 2)
-            Raw (dx, dy) vectors for each tracked feature in frame i.
-        fps : float
+        Passing it back as ``iter_frames(resume=state)`` continues tracking
+        with the same output as an uninterrupted run.  None before the
+        first frame has been yielded.
+        """
+        if self._state is None:
+            return None
+        index, gray, tracks = self._state
+        state = {
+            "index": index,
+            "gray": gray.copy(),
+            "next_id": self._next_id,
+            "cell_targets": {k: v.copy() for k, v in self._cell_targets.items()},
+            "anchor_labels": np.array(list(self._anchors), dtype=np.int64),
+            "anchor_levels": np.array(list(self._anchors.values()),
+                                      dtype=np.float32).reshape(-1, 2),
+            **{f: getattr(tracks, f).copy() for f in _TrackSet.FIELDS},
+        }
+        return self._save_motion_prior(state)
+
+    def iter_frames(self, resume=None):
+        """
+        Generator yielding a ``TrackedFrame`` per processed frame.
+
+        Memory use is bounded by the current and previous frame only, so the
+        caller decides what (if anything) to keep.
+
+        Parameters
+        ----------
+        resume : dict or None
+            A ``checkpoint_state()`` snapshot; tracking continues from the
+            frame after it instead of from ``start_frame``.
         """
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
             raise ValueError(f"Cannot open video: {self.video_path}")
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        if fps <= 0:
-            fps = 30.0  # safe fallback
+        first_index = self.start_frame if resume is None else resume["index"] + self.stride
+        if first_index > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_index)
 
-        ret, old_frame = cap.read()
-        if not ret:
-            raise ValueError("Cannot read first frame.")
+        self._crop = self._crop_rect(cap)
+        # Chunks starting at different frames get disjoint track-id ranges
+        self._next_id = self.start_frame << 32
+        self._motion_prior = None
+        self._anchors = {}
+        offset = np.zeros(2, dtype=np.float32)
+        if self._crop is not None:
+            offset[:] = self._crop[:2]
 
-        old_gray = cv2.cvtColor(old_frame, cv2.COLOR_BGR2GRAY)
-        p0 = self._detect_features(old_gray)
-        origin = p0.copy()           # anchor for absolute displacement
+        reader = FrameReader(cap, depth=self.pipeline_depth, drop_policy=self.drop_policy,
+                             start_index=first_index, crop=self._crop,
+                             profiler=self.profiler, stride=self.stride)
+        self.pipeline_stats = reader.stats
 
-        all_displacements = []
-        frame_idx = 0
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if fps <= 0:
+                fps = 30.0  # safe fallback
+            self.source_fps = fps
+            self.fps = fps / self.stride
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_idx += 1
+            prof = self.profiler
+            frames = iter(reader.start())
+            if resume is None:
+                first = next(frames, None)
+                if first is None:
+                    raise ValueError("Cannot read first frame.")
+                old_gray = first.gray
+                tracks = self._spawn(*self._detect_features(old_gray))
+            else:
+                old_gray = resume["gray"]
+                tracks = _TrackSet(*(resume[f] for f in _TrackSet.FIELDS))
+                self._next_id = resume["next_id"]
+                self._cell_targets = dict(resume["cell_targets"])
+                self._anchors = dict(zip(resume["anchor_labels"].tolist(),
+                                         resume["anchor_levels"]))
+                self._restore_motion_prior(resume)
 
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            for decoded in frames:
+                frame_idx = decoded.index
+                if self.end_frame is not None and frame_idx >= self.end_frame:
+                    break
+                frame_gray = decoded.gray
 
-            p1, st, err = cv2.calcOpticalFlowPyrLK(
-                old_gray, frame_gray, p0, None, **self.lk_params
-            )
+                prof.observe("features", len(tracks))
+                if self.predict_flow:
+                    predicted = tracks.pts + tracks.vel
+                    with prof.stage("lk_flow"):
+                        p1, st, err = cv2.calcOpticalFlowPyrLK(
+                            old_gray, frame_gray, tracks.pts.reshape(-1, 1, 2),
+                            predicted.reshape(-1, 1, 2).copy(),
+                            flags=cv2.OPTFLOW_USE_INITIAL_FLOW, **self.predicted_lk_params
+                        )
+                else:
+                    with prof.stage("lk_flow"):
+                        p1, st, err = cv2.calcOpticalFlowPyrLK(
+                            old_gray, frame_gray, tracks.pts.reshape(-1, 1, 2), None,
+                            **self.lk_params
+                        )
+                if p1 is not None and self.fb_threshold is not None:
+                    st = st.ravel() & self._fb_consistent(old_gray, frame_gray, tracks.pts, p1)
 
-            if p1 is None or np.sum(st) < 8:
-                # Re-initialize on catastrophic track failure
-                p0 = self._detect_features(frame_gray)
-                origin = p0.copy()
-                old_gray = frame_gray.copy()
-                all_displacements.append(np.zeros((1, 2), dtype=np.float32))
-                continue
+                if p1 is None or np.sum(st) < 8:
+                    # Re-initialize on catastrophic track failure
+                    tracks = self._spawn(*self._detect_features(frame_gray), reference=tracks)
+                    old_gray = frame_gray
+                    self._state = (frame_idx, old_gray, tracks)
+                    # One zero-motion row per ROI, held at its anchor level
+                    n_rois = len(self._regions())
+                    yield TrackedFrame(
+                        frame_idx,
+                        np.zeros((n_rois, 2), dtype=np.float32),
+                        np.empty((0, 2), dtype=np.float32),
+                        np.arange(n_rois, dtype=np.int32),
+                        np.empty(0, dtype=np.int64),
+                        np.empty(0, dtype=np.float32),
+                        decoded.timestamp,
+                        np.array([self._anchors.get(k, np.zeros(2, dtype=np.float32))
+                                  for k in range(n_rois)], dtype=np.float32),
+                        np.empty(0, dtype=bool),
+                    )
+                    continue
 
-            good_new = p1[st.ravel() == 1]
-            good_old = p0[st.ravel() == 1]
+                ok = st.ravel() == 1
+                prof.observe("lk_tracked", int(ok.sum()))
+                good_old = tracks.pts[ok]
+                tracks = tracks.select(ok)
+                tracks.pts = p1[ok].reshape(-1, 2)
+                if self.predict_flow:
+                    # Alpha-beta update: positions stay the raw LK measurement
+                    innovation = tracks.pts - predicted[ok]
+                    tracks.vel = tracks.vel + self.predict_gain * innovation
+                lk_err = err[ok].ravel()
 
-            # --- Homography-based camera motion removal ---
-            frame_disp = self._compensate_homography(good_old, good_new, frame_gray.shape)
+                # --- Camera motion removal ---
+                on_structure = tracks.labels >= 0
+                frame_disp, inliers = self._compensate_camera_motion(
+                    good_old, tracks.pts, frame_gray.shape, ~on_structure)
+                # Running sum per track: O(1) per feature, no history kept
+                tracks.absolute = tracks.absolute + frame_disp
 
-            all_displacements.append(frame_disp)
+                # Background points only constrain the camera model
+                tracked = TrackedFrame(
+                    frame_idx,
+                    frame_disp[on_structure],
+                    tracks.pts[on_structure] + offset,
+                    tracks.labels[on_structure],
+                    tracks.ids[on_structure],
+                    lk_err[on_structure],
+                    decoded.timestamp,
+                    tracks.absolute[on_structure],
+                    inliers[on_structure],
+                )
 
-            old_gray = frame_gray.copy()
-            p0 = good_new.reshape(-1, 1, 2)
+                old_gray = frame_gray
 
-            # Periodic feature re-initialization to fight drift
-            if frame_idx % self.reinit_interval == 0:
-                new_pts = self._detect_features(frame_gray)
-                p0 = new_pts
-                origin = p0.copy()
+                if self.reinit_mode == "replenish":
+                    # Top up only the grid cells that lost tracks; survivors keep their ids
+                    if self._due(frame_idx, self.replenish_interval):
+                        with prof.stage("replenish"):
+                            new = self._spawn(*self._replenish(frame_gray, tracks),
+                                              reference=tracks)
+                        tracks = tracks.extend(new)
+                elif self._due(frame_idx, self.reinit_interval):
+                    # Periodic feature re-initialization to fight drift
+                    tracks = self._spawn(*self._detect_features(frame_gray), reference=tracks)
 
-        cap.release()
-        return all_displacements, fps
+                # Re-detection happens before the yield so the state seen by
+                # checkpoint_state() is complete for this frame.
+                self._state = (frame_idx, old_gray, tracks)
+                yield tracked
+        finally:
+            reader.stop()
+            cap.release()
 
     # ------------------------------------------------------------------
     # Private helpers
     # ------------------------------------------------------------------
 
-    def _detect_features(self, gray):
-        mask = None
+    def _regions(self):
+        """[(name, (x, y, w, h) or None)] — None means the whole frame."""
+        if self.rois:
+            return list(self.rois.items())
         if self.roi is not None:
-            x, y, w, h = self.roi
-            mask = np.zeros_like(gray)
-            mask[y : y + h, x : x + w] = 255
-        pts = cv2.goodFeaturesToTrack(gray, mask=mask, **self.feature_params)
-        if pts is None:
-            raise RuntimeError("No features detected. Check video content or ROI.")
-        return pts
+            return [("roi", self.roi)]
+        return [("frame", None)]
+
+    def _due(self, frame_idx, interval):
+        """True on every ``interval``-th processed frame (frame indices step by stride)."""
+        return (frame_idx // self.stride) % interval == 0
+
+    def _crop_rect(self, cap):
+        """Padded bounding box of all ROIs as (x0, y0, x1, y1), or None for full frames."""
+        if not self.roi_crop or (self.roi is None and not self.rois):
+            return None
+        frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        rects = np.array([rect for _, rect in self._regions()])
+        x0, y0 = rects[:, :2].min(axis=0)
+        x1, y1 = (rects[:, :2] + rects[:, 2:]).max(axis=0)
+        pad = self.crop_padding
+        return (
+            max(0, int(x0) - pad),
+            max(0, int(y0) - pad),
+            min(frame_w, int(x1) + pad),
+            min(frame_h, int(y1) + pad),
+        )
+
+    def _region_rects(self, gray):
+        """[(label, (x, y, w, h))] of each ROI in ``gray`` coordinates, clipped to it."""
+        gh, gw = gray.shape[:2]
+        rects = []
+        for k, (_, rect) in enumerate(self._regions()):
+            if rect is None:
+                rects.append((k, (0, 0, gw, gh)))
+                continue
+            x, y, w, h = rect
+            if self._crop is not None:
+                x, y = x - self._crop[0], y - self._crop[1]
+            x0, y0 = max(0, x), max(0, y)
+            x1, y1 = min(gw, x + w), min(gh, y + h)
+            rects.append((k, (x0, y0, max(0, x1 - x0), max(0, y1 - y0))))
+        return rects
+
+    def _tracks_background(self):
+        """True when background corners are tracked for the camera model."""
+        return (self.roi is not None or bool(self.rois)) and self.band_corners > 0
+
+    def _band_mask(self, gray):
+        """255 on the background (outside every ROI) of ``gray``, else 0."""
+        mask = np.full_like(gray, 255)
+        for _, (x, y, w, h) in self._region_rects(gray):
+            mask[y : y + h, x : x + w] = 0
+        return mask
+
+    def _detect_features(self, gray):
+        """
+        Detect corners to track in ``gray`` (the full frame or the ROI crop).
+
+        Each ROI gets its own ``maxCorners`` budget so a highly textured
+        member cannot starve the others.
+
+        Returns
+        -------
+        pts    : np.ndarray  (N, 2) float32, in ``gray`` coordinates
+        labels : np.ndarray  (N,) int — ROI index (see ``roi_names``), or
+                 -1 for background points used only for the camera model
+        """
+        with self.profiler.stage("detect_features"):
+            self._cell_targets = {}    # replenishment restarts from this detection
+            all_pts, all_labels = [], []
+            gray_rects = dict(self._region_rects(gray))
+
+            for k, (_, rect) in enumerate(self._regions()):
+                mask = None
+                if rect is not None:
+                    x, y, w, h = gray_rects[k]
+                    mask = np.zeros_like(gray)
+                    mask[y : y + h, x : x + w] = 255
+                pts = cv2.goodFeaturesToTrack(gray, mask=mask, **self.feature_params)
+                if pts is not None:
+                    all_pts.append(pts.reshape(-1, 2))
+                    all_labels.append(np.full(len(pts), k, dtype=np.int32))
+
+            if not all_pts:
+                raise RuntimeError("No features detected. Check video content or ROI.")
+
+            if self._tracks_background():
+                band_params = dict(self.feature_params, maxCorners=self.band_corners)
+                band = cv2.goodFeaturesToTrack(gray, mask=self._band_mask(gray), **band_params)
+                if band is not None:
+                    all_pts.append(band.reshape(-1, 2))
+                    all_labels.append(np.full(len(band), -1, dtype=np.int32))
 
-    def _compensate_homography(self, pts_old, pts_new, frame_shape):
+            return np.concatenate(all_pts), np.concatenate(all_labels)
+
+    def _replenish(self, gray, tracks):
+        """New (pts, labels) for the cells / band that fell below their quota."""
+        new_pts, new_labels = [], []
+
+        for k, rect in self._region_rects(gray):
+            found, self._cell_targets[k] = replenish_features(
+                gray, tracks.pts[tracks.labels == k], rect, self.feature_params,
+                targets=self._cell_targets.get(k), grid=self.replenish_grid,
+                min_fill=self.replenish_min_fill,
+            )
+            new_pts.append(found)
+            new_labels.append(np.full(len(found), k, dtype=np.int32))
+
+        if self._tracks_background():
+            band_pts = tracks.pts[tracks.labels == -1]
+            missing = self.band_corners - len(band_pts)
+            if missing >= self.band_corners * self.replenish_min_fill:
+                mask = _exclusion_mask(self._band_mask(gray), band_pts,
+                                       self.feature_params.get("minDistance", 7))
+                band_params = dict(self.feature_params, maxCorners=missing)
+                band = cv2.goodFeaturesToTrack(gray, mask=mask, **band_params)
+                if band is not None:
+                    new_pts.append(band.reshape(-1, 2))
+                    new_labels.append(np.full(len(band), -1, dtype=np.int32))
+
+        if not new_pts:
+            return np.empty((0, 2), dtype=np.float32), np.empty(0, dtype=np.int32)
+        return np.concatenate(new_pts), np.concatenate(new_labels)
+
+    def _spawn(self, pts, labels, reference=None):
+        """
+        Wrap freshly detected points in a _TrackSet with new track ids.
+
+        New tracks are anchored at their ROI's current absolute level, the
+        median over the ``reference`` tracks (the ones they join or
+        replace), so re-detection leaves no step in absolute displacement.
+        """
+        if reference is not None and len(reference):
+            self._anchors.update(absolute_levels(reference.labels, reference.absolute))
+        absolute = np.zeros((len(pts), 2), dtype=np.float32)
+        for k, level in self._anchors.items():
+            absolute[labels == k] = level
+        ids = np.arange(self._next_id, self._next_id + len(pts), dtype=np.int64)
+        self._next_id += len(pts)
+        return _TrackSet(pts.astype(np.float32), labels, ids,
+                         np.zeros((len(pts), 2), dtype=np.float32), absolute)
+
+    def _fb_consistent(self, old_gray, frame_gray, pts_old, pts_new):
+        """Mask of tracks whose backward LK round trip lands within fb_threshold px."""
+        # Seeded at the forward start, the backward pass only has to resolve
+        # the round-trip residual, so one pyramid level above the base suffices.
+        back_params = dict(self.lk_params, maxLevel=min(1, self.lk_params["maxLevel"]))
+        with self.profiler.stage("lk_backward"):
+            p0r, st_back, _ = cv2.calcOpticalFlowPyrLK(
+                frame_gray, old_gray, pts_new, pts_old.reshape(-1, 1, 2).copy(),
+                flags=cv2.OPTFLOW_USE_INITIAL_FLOW, **back_params
+            )
+        fb_err = np.linalg.norm(p0r.reshape(-1, 2) - pts_old, axis=1)
+        consistent = (st_back.ravel() == 1) & (fb_err < self.fb_threshold)
+        self.profiler.observe("fb_rejected", int(len(consistent) - consistent.sum()))
+        return consistent.astype(np.uint8)
+
+    def _save_motion_prior(self, state):
+        """Add the camera-model prior (if any) to a checkpoint state dict."""
+        if self._motion_prior is not None:
+            state["motion_prior"] = self._motion_prior.matrix.copy()
+            state["motion_prior_kind"] = np.array(MODELS.index(self._motion_prior.kind))
+        return state
+
+    def _restore_motion_prior(self, resume):
+        if "motion_prior" in resume:
+            kind = MODELS[int(resume["motion_prior_kind"])]
+            self._motion_prior = MotionFit(kind, resume["motion_prior"], None,
+                                           float("nan"), False)
+
+    def _compensate_camera_motion(self, pts_old, pts_new, frame_shape, background=None):
         """
-        Estimate global camera motion via homography and subtract it from
-        per-feature displacements so only structural motion remains.
+        Estimate global camera motion (see motion_models.py) and subtract it
+        from per-feature displacements so only structural motion remains.
 
-        Falls back to median subtraction when homography cannot be estimated.
+        ``background`` marks the points the model may be fitted on (see
+        ``motion_points``); it is applied to all of them.  Falls back to
+        median subtraction when no model can be estimated.
+
+        Returns
+        -------
+        structural : np.ndarray  (N, 2) displacement with camera motion removed
+        inliers    : np.ndarray  (N,) bool, within the model's threshold; only
+                     informative when the model was fitted on all the points,
+                     all True otherwise
         """
+        threshold = 3.0
+        everyone = np.ones(len(pts_old), dtype=bool)
         if len(pts_old) < 8:
-            # Not enough points for homography → median fallback
+            # Not enough points for a robust fit → median fallback
             raw = pts_new - pts_old
             cam_motion = np.median(raw, axis=0)
-            return raw - cam_motion
+            return raw - cam_motion, everyone
 
-        H, inlier_mask = cv2.findHomography(
-            pts_old.reshape(-1, 1, 2),
-            pts_new.reshape(-1, 1, 2),
-            cv2.RANSAC,
-            ransacReprojThreshold=3.0,
-        )
+        src, dst = pts_old, pts_new
+        restricted = (self.motion_points == "background" and background is not None
+                      and np.count_nonzero(background) >= 8)
+        if restricted:
+            src, dst = src[background], dst[background]
+        self.profiler.observe("motion_fit_points", len(src))
+        if self.motion_subsample and len(src) > self.motion_subsample:
+            pick = np.linspace(0, len(src) - 1, self.motion_subsample).round().astype(int)
+            src, dst = src[pick], dst[pick]
 
-        if H is None:
+        with self.profiler.stage("motion_fit"):
+            fit = estimate_motion(
+                src, dst, model=self.motion_model, threshold=threshold,
+                max_iters=self.ransac_max_iters,
+                prior=self._motion_prior if self.motion_prior else None,
+            )
+
+        if fit is None:
+            self._motion_prior = None
             raw = pts_new - pts_old
             cam_motion = np.median(raw, axis=0)
-            return raw - cam_motion
+            return raw - cam_motion, everyone
+
+        self._motion_prior = fit
+        prof = self.profiler
+        prof.observe("ransac_inlier_ratio", float(fit.inliers.mean()))
+        prof.observe("motion_residual_px", fit.residual)
+        prof.observe(f"motion_model_{fit.kind}", 1)
+        prof.observe("motion_prior_reused", int(fit.from_prior))
 
-        # Project old points through H → predicted new positions if camera-only motion
-        h, w = frame_shape
-        pts_old_h = pts_old.reshape(-1, 1, 2).astype(np.float32)
-        predicted = cv2.perspectiveTransform(pts_old_h, H).reshape(-1, 2)
+        # Predicted new positions if the motion were camera-only
+        with prof.stage("motion_apply"):
+            predicted = apply_model(fit.kind, fit.matrix, pts_old)
 
         # Residual after removing camera motion = structural displacement
         structural = pts_new - predicted
-        return structural.astype(np.float32)
+        if restricted:
+            # Fitted on background points: says nothing about the others
+            return structural.astype(np.float32), everyone
+        # Every point's reprojection error, subsampled out of the fit or not
+        inliers = np.einsum("ij,ij->i", structural, structural) < threshold ** 2
+        return structural.astype(np.float32), inliers
+
+
+# ---------------------------------------------------------------------------
+# Dense engine
+# ---------------------------------------------------------------------------
+
+DENSE_PRESETS = {
+    "ultrafast": cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST,
+    "fast": cv2.DISOPTICAL_FLOW_PRESET_FAST,
+    "medium": cv2.DISOPTICAL_FLOW_PRESET_MEDIUM,
+}
+
+
+class DenseFlowTracker(VibrationTracker):
+    """
+    Dense optical-flow alternative to the sparse corner tracker.
+
+    Smooth surfaces (concrete, painted steel) give Shi-Tomasi too few
+    corners to track.  This engine instead computes a dense flow field
+    (DIS or Farneback) over the ROIs' padded bounding box at reduced
+    resolution and averages it over a fixed grid of square cells.  Each
+    cell is a virtual sensor with a stable id.  Cells whose centre lies in
+    no ROI are background sensors, used only for the camera-motion model
+    exactly like the sparse engine's background corners.
+
+    Output is the same ``TrackedFrame`` stream as ``VibrationTracker``:
+    ``points`` are the (fixed) sensor centres and ``errors`` the spread of
+    the flow within each cell.  The sparse-only settings (reinit,
+    replenish, LK, forward-backward, prediction) are ignored.
+    """
+
+    def __init__(self, video_path, dense_method="dis", dense_preset="fast",
+                 dense_scale=0.5, dense_cell=32, **kwargs):
+        """
+        Parameters
+        ----------
+        video_path : str
+            Path to input video file.
+        dense_method : str
+            'dis' (cv2.DISOpticalFlow) or 'farneback'.
+        dense_preset : str
+            DIS preset: 'ultrafast', 'fast' or 'medium'.
+        dense_scale : float
+            Resolution at which the flow is computed (0.5 = half size).
+        dense_cell : int
+            Sensor cell size in full-resolution pixels.
+        **kwargs
+            Forwarded to ``VibrationTracker`` (roi, rois, roi_crop,
+            crop_padding, motion_model, ...).
+        """
+        if dense_method not in ("dis", "farneback"):
+            raise ValueError(f"Unknown dense method: {dense_method}")
+        if dense_preset not in DENSE_PRESETS:
+            raise ValueError(f"Unknown DIS preset: {dense_preset}")
+        super().__init__(video_path, **kwargs)
+        self.dense_method = dense_method
+        self.dense_preset = dense_preset
+        self.dense_scale = dense_scale
+        self.dense_cell = dense_cell
+        self._grid = None
+
+    def cache_key_params(self):
+        return dict(
+            super().cache_key_params(),
+            engine="dense",
+            dense_method=self.dense_method,
+            dense_preset=self.dense_preset,
+            dense_scale=self.dense_scale,
+            dense_cell=self.dense_cell,
+        )
+
+    def checkpoint_state(self):
+        if self._state is None:
+            return None
+        index, small, absolute = self._state
+        # Same keys as the sparse state; sensors have no ids or cells to restore
+        state = {"index": index, "gray": small.copy(), "next_id": 0, "cell_targets": {},
+                 "absolute": absolute.copy()}
+        return self._save_motion_prior(state)
+
+    def iter_frames(self, resume=None):
+        """
+        Generator yielding a ``TrackedFrame`` of sensor displacements per
+        processed frame (see ``VibrationTracker.iter_frames``).
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {self.video_path}")
+
+        first_index = self.start_frame if resume is None else resume["index"] + self.stride
+        if first_index > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_index)
+
+        self._crop = self._crop_rect(cap)
+        self._motion_prior = None
+        offset = np.zeros(2, dtype=np.float32)
+        if self._crop is not None:
+            offset[:] = self._crop[:2]
+
+        reader = FrameReader(cap, depth=self.pipeline_depth, drop_policy=self.drop_policy,
+                             start_index=first_index, crop=self._crop,
+                             profiler=self.profiler, stride=self.stride)
+        self.pipeline_stats = reader.stats
+        flow_engine = None
+        if self.dense_method == "dis":
+            flow_engine = cv2.DISOpticalFlow_create(DENSE_PRESETS[self.dense_preset])
+
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if fps <= 0:
+                fps = 30.0  # safe fallback
+            self.source_fps = fps
+            self.fps = fps / self.stride
+
+            prof = self.profiler
+            frames = iter(reader.start())
+            if resume is None:
+                first = next(frames, None)
+                if first is None:
+                    raise ValueError("Cannot read first frame.")
+                work = self._setup_sensors(first.gray)
+                old_small = self._downscale(first.gray, work)
+                absolute = None
+            else:
+                old_small = resume["gray"]
+                self._restore_motion_prior(resume)
+                work = None
+                absolute = resume["absolute"]
+
+            for decoded in frames:
+                frame_idx = decoded.index
+                if self.end_frame is not None and frame_idx >= self.end_frame:
+                    break
+                if work is None:
+                    work = self._setup_sensors(decoded.gray)
+                small = self._downscale(decoded.gray, work)
+
+                with prof.stage("dense_flow"):
+                    if flow_engine is not None:
+                        flow = flow_engine.calc(old_small, small, None)
+                    else:
+                        flow = cv2.calcOpticalFlowFarneback(old_small, small, None,
+                                                            0.5, 3, 15, 3, 5, 1.2, 0)
+                with prof.stage("dense_aggregate"):
+                    centres, labels, shift, spread = self._sensor_readings(flow, work)
+                prof.observe("features", len(centres))
+
+                on_structure = labels >= 0
+                frame_disp, inliers = self._compensate_camera_motion(
+                    centres, centres + shift, decoded.gray.shape, ~on_structure)
+                # Sensors never move, so each is anchored once for the whole run
+                absolute = frame_disp if absolute is None else absolute + frame_disp
+
+                old_small = small
+                self._state = (frame_idx, old_small, absolute)
+                yield TrackedFrame(
+                    frame_idx,
+                    frame_disp[on_structure],
+                    centres[on_structure] + offset,
+                    labels[on_structure],
+                    np.flatnonzero(on_structure).astype(np.int64),
+                    spread[on_structure],
+                    decoded.timestamp,
+                    absolute[on_structure],
+                    inliers[on_structure],
+                )
+        finally:
+            reader.stop()
+            cap.release()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _setup_sensors(self, gray):
+        """
+        Fix the area of ``gray`` the flow is computed on and return it as
+        (x0, y0, x1, y1): the padded bounding box of all ROIs, or the whole
+        image in crop mode or without an ROI.
+        """
+        gh, gw = gray.shape[:2]
+        self._rects = self._region_rects(gray)
+        boxes = np.array([rect for _, rect in self._rects])
+        pad = self.crop_padding if (self.roi is not None or self.rois) else 0
+        x0, y0 = np.maximum(boxes[:, :2].min(axis=0) - pad, 0)
+        x1, y1 = (boxes[:, :2] + boxes[:, 2:]).max(axis=0) + pad
+        self._cell = max(2, int(round(self.dense_cell * self.dense_scale)))
+        self._grid = None
+        return int(x0), int(y0), int(min(x1, gw)), int(min(y1, gh))
+
+    def _downscale(self, gray, work):
+        x0, y0, x1, y1 = work
+        area = gray[y0:y1, x0:x1]
+        if self.dense_scale == 1:
+            return np.ascontiguousarray(area)
+        return cv2.resize(area, None, fx=self.dense_scale, fy=self.dense_scale,
+                          interpolation=cv2.INTER_AREA)
+
+    def _sensor_readings(self, flow, work):
+        """
+        Average a (H, W, 2) flow field over the sensor grid with block
+        reductions (no per-sensor loop).
+
+        Returns
+        -------
+        centres : np.ndarray  (S, 2) float32 sensor centres in ``gray`` coordinates
+        labels  : np.ndarray  (S,) ROI index of each sensor, -1 for background
+        shift   : np.ndarray  (S, 2) float32 mean flow per sensor (full-res px)
+        spread  : np.ndarray  (S,) float32 flow standard deviation per sensor
+        """
+        cell = self._cell
+        ny, nx = flow.shape[0] // cell, flow.shape[1] // cell
+        area = flow[: ny * cell, : nx * cell]
+        # Sum each cell's rows first (contiguous), then its columns: several
+        # times faster than one reduction over both axes of a 5-D view.
+        n = float(cell * cell)
+        mean = _block_sum(area, ny, nx, cell) / n
+        var = _block_sum(np.square(area), ny, nx, cell) / n - mean * mean
+        scale = self.dense_scale
+        shift = (mean.reshape(-1, 2) / scale).astype(np.float32)
+        spread = (np.sqrt(np.maximum(var, 0).sum(axis=-1)).ravel() / scale).astype(np.float32)
+
+        if self._grid is None:
+            self._grid = self._sensor_grid(work, ny, nx)
+        centres, labels = self._grid
+        return centres, labels, shift, spread
+
+    def _sensor_grid(self, work, ny, nx):
+        """Sensor centres (``gray`` coordinates) and ROI labels of the ny × nx grid."""
+        cell, scale = self._cell, self.dense_scale
+        u = (np.arange(nx) * cell + cell / 2) / scale - 0.5 + work[0]
+        v = (np.arange(ny) * cell + cell / 2) / scale - 0.5 + work[1]
+        gx, gy = np.meshgrid(u, v)
+        centres = np.column_stack([gx.ravel(), gy.ravel()]).astype(np.float32)
+
+        labels = np.full(len(centres), -1, dtype=np.int32)
+        for k, (x, y, w, h) in self._rects:
+            inside = ((centres[:, 0] >= x) & (centres[:, 0] < x + w)
+                      & (centres[:, 1] >= y) & (centres[:, 1] < y + h))
+            labels[inside & (labels < 0)] = k
+        return centres, labels
+
+
+def _block_sum(field, ny, nx, cell):
+    """(ny, nx, 2) sums of a (ny·cell, nx·cell, 2) field over cell × cell blocks."""
+    rows = field.reshape(ny, cell, nx * cell * 2).sum(axis=1)
+    return rows.reshape(ny, nx, cell, 2).sum(axis=2)
+
+
+# ---------------------------------------------------------------------------
+# Template engine
+# ---------------------------------------------------------------------------
+
+class TemplateTracker(VibrationTracker):
+    """
+    Phase-correlation template engine for high-frame-rate video.
+
+    Tracks a handful of square patches per ROI (the strongest corners, or
+    user-given centres) by batched FFT phase correlation (see
+    phase_correlation.py), giving subpixel frame-to-frame shifts for far
+    less work per frame than LK on hundreds of corners.  With an ROI set,
+    as many patches again are placed on the background for the camera
+    model.
+
+    Output is the same ``TrackedFrame`` stream as ``VibrationTracker``:
+    ``points`` are the fixed patch centres and ``errors`` are
+    1 − correlation peak height.
+    """
+
+    def __init__(self, video_path, template_size=64, template_count=16, templates=None,
+                 **kwargs):
+        """
+        Parameters
+        ----------
+        video_path : str
+            Path to input video file.
+        template_size : int
+            Patch side in pixels (a power of two keeps the FFTs fast).
+        template_count : int
+            Patches auto-selected per ROI (and on the background).
+        templates : list of (x, y) or None
+            Full-frame patch centres to use instead of auto-selection.
+            Each is assigned to the ROI containing it, or to the background.
+        **kwargs
+            Forwarded to ``VibrationTracker`` (roi, rois, roi_crop,
+            motion_model, ...).
+        """
+        super().__init__(video_path, **kwargs)
+        self.template_size = template_size
+        self.template_count = template_count
+        self.templates = templates
+        self._correlator = None
+        self._labels = None
+
+    def cache_key_params(self):
+        return dict(
+            super().cache_key_params(),
+            engine="template",
+            template_size=self.template_size,
+            template_count=self.template_count,
+            templates=self.templates,
+        )
+
+    def checkpoint_state(self):
+        if self._state is None:
+            return None
+        index, gray, absolute = self._state
+        state = {
+            "index": index,
+            "gray": gray.copy(),
+            "next_id": 0,
+            "cell_targets": {},
+            "template_pts": self._correlator.centres.copy(),
+            "template_labels": self._labels.copy(),
+            "absolute": absolute.copy(),
+        }
+        return self._save_motion_prior(state)
+
+    def iter_frames(self, resume=None):
+        """
+        Generator yielding a ``TrackedFrame`` of patch displacements per
+        processed frame (see ``VibrationTracker.iter_frames``).
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {self.video_path}")
+
+        first_index = self.start_frame if resume is None else resume["index"] + self.stride
+        if first_index > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_index)
+
+        self._crop = self._crop_rect(cap)
+        self._motion_prior = None
+        offset = np.zeros(2, dtype=np.float32)
+        if self._crop is not None:
+            offset[:] = self._crop[:2]
+
+        reader = FrameReader(cap, depth=self.pipeline_depth, drop_policy=self.drop_policy,
+                             start_index=first_index, crop=self._crop,
+                             profiler=self.profiler, stride=self.stride)
+        self.pipeline_stats = reader.stats
+
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if fps <= 0:
+                fps = 30.0  # safe fallback
+            self.source_fps = fps
+            self.fps = fps / self.stride
+
+            prof = self.profiler
+            frames = iter(reader.start())
+            if resume is None:
+                first = next(frames, None)
+                if first is None:
+                    raise ValueError("Cannot read first frame.")
+                old_gray = first.gray
+                centres, self._labels = self._place_templates(old_gray, offset)
+                absolute = np.zeros((len(centres), 2), dtype=np.float32)
+            else:
+                old_gray = resume["gray"]
+                centres, self._labels = resume["template_pts"], resume["template_labels"]
+                self._restore_motion_prior(resume)
+                absolute = resume["absolute"]
+            self._correlator = PhaseCorrelator(centres, self.template_size)
+            self._correlator.reset(old_gray)
+
+            on_structure = self._labels >= 0
+            ids = np.flatnonzero(on_structure).astype(np.int64)
+            for decoded in frames:
+                frame_idx = decoded.index
+                if self.end_frame is not None and frame_idx >= self.end_frame:
+                    break
+                prof.observe("features", len(centres))
+                with prof.stage("phase_correlate"):
+                    shifts, response = self._correlator.update(decoded.gray)
+
+                frame_disp, inliers = self._compensate_camera_motion(
+                    centres, centres + shifts, decoded.gray.shape, ~on_structure)
+                # Patches stay put, so each is anchored once for the whole run
+                absolute = absolute + frame_disp
+
+                self._state = (frame_idx, decoded.gray, absolute)
+                yield TrackedFrame(
+                    frame_idx,
+                    frame_disp[on_structure],
+                    centres[on_structure] + offset,
+                    self._labels[on_structure],
+                    ids,
+                    1.0 - response[on_structure],
+                    decoded.timestamp,
+                    absolute[on_structure],
+                    inliers[on_structure],
+                )
+        finally:
+            reader.stop()
+            cap.release()
+
+    def _place_templates(self, gray, offset):
+        """Patch centres (``gray`` coordinates) and ROI labels, -1 for background."""
+        size = self.template_size
+        if self.templates is not None:
+            gh, gw = gray.shape[:2]
+            centres = np.asarray(self.templates, dtype=np.float32).reshape(-1, 2) - offset
+            centres = np.clip(centres, size // 2, (gw - size + size // 2, gh - size + size // 2))
+            labels = np.full(len(centres), -1, dtype=np.int32)
+            for k, (x, y, w, h) in self._region_rects(gray):
+                inside = ((centres[:, 0] >= x) & (centres[:, 0] < x + w)
+                          & (centres[:, 1] >= y) & (centres[:, 1] < y + h))
+                labels[inside & (labels < 0)] = k
+            return centres.astype(np.float32), labels
+
+        all_pts, all_labels = [], []
+        for k, (x, y, w, h) in self._region_rects(gray):
+            mask = np.zeros_like(gray)
+            mask[y : y + h, x : x + w] = 255
+            pts = select_patches(gray, size, self.template_count, mask=mask)
+            all_pts.append(pts)
+            all_labels.append(np.full(len(pts), k, dtype=np.int32))
+        if self._tracks_background():
+            pts = select_patches(gray, size, self.template_count, mask=self._band_mask(gray))
+            all_pts.append(pts)
+            all_labels.append(np.full(len(pts), -1, dtype=np.int32))
+
+        centres = np.concatenate(all_pts)
+        if len(centres) == 0:
+            raise RuntimeError("No templates found. Check video content, ROI or template size.")
+        return centres, np.concatenate(all_labels)
+
+
+# Tracking engines selectable by name (main.py --engine)
+ENGINES = {
+    "sparse": VibrationTracker,
+    "dense": DenseFlowTracker,
+    "template": TemplateTracker,
+}
@@ -0,0 +1,264 @@
+"""
+Frame Pipeline — Decoupled decode / track stages
+================================================
+Runs ``cap.read()`` and grayscale conversion on a dedicated decoder thread
+and hands frames to the tracker through a bounded queue, so decoding the
+next frame overlaps optical flow on the current one.  OpenCV releases the
+GIL inside both stages, which lets one camera use two cores.
+
+With ``stride > 1`` only every stride-th frame is decoded: the frames in
+between are skipped with ``cap.grab()``, which demuxes (and for most
+codecs decodes) but never converts or copies the image out.
+
+Every frame carries a timestamp in seconds: the container's presentation
+time (``CAP_PROP_POS_MSEC``) for files, so variable-frame-rate recordings
+keep their true timing, and the wall clock at capture for live cameras,
+so dropped frames leave visible gaps.
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from profiling import NULL_PROFILER
+
+
+DecodedFrame = namedtuple("DecodedFrame", ["index", "gray", "color", "timestamp"])
+
+DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+_END = object()
+
+# Wraps an exception raised in the decoder thread, re-raised by the consumer
+_Failure = namedtuple("_Failure", ["error"])
+
+
+class PipelineStats:
+    """Per-stage counters and busy times for a FrameReader."""
+
+    def __init__(self):
+        self.decoded = 0
+        self.dropped = 0
+        self.skipped = 0           # frames passed over with grab() (stride)
+        self.consumed = 0
+        self.decode_time = 0.0     # seconds spent in read + cvtColor
+        self.consume_time = 0.0    # seconds the consumer spent per frame
+        self.wait_time = 0.0       # seconds the consumer waited on the queue
+        self.started_at = None
+        self.stopped_at = None
+
+    def summary(self):
+        """
+        Returns
+        -------
+        dict with keys:
+            - decode_fps: frames/s the decoder stage could sustain alone
+            - track_fps: frames/s the consumer stage could sustain alone
+            - throughput_fps: frames/s actually delivered end-to-end
+            - decoded, consumed, dropped, skipped: frame counts
+            - queue_wait_s: time the consumer was starved (decode-bound)
+        """
+        end = self.stopped_at if self.stopped_at is not None else time.perf_counter()
+        wall = (end - self.started_at) if self.started_at is not None else 0.0
+        return {
+            "decode_fps": self.decoded / self.decode_time if self.decode_time > 0 else 0.0,
+            "track_fps": self.consumed / self.consume_time if self.consume_time > 0 else 0.0,
+            "throughput_fps": self.consumed / wall if wall > 0 else 0.0,
+            "decoded": self.decoded,
+            "consumed": self.consumed,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "queue_wait_s": round(self.wait_time, 4),
+        }
+
+
+class FrameReader:
+    """
+    Iterable source of ``DecodedFrame`` items backed by a cv2.VideoCapture.
+
+    With ``depth > 0`` a producer thread decodes ahead into a bounded queue;
+    with ``depth == 0`` frames are decoded inline on the caller's thread.
+    Both modes yield the same items, so consumers have a single code path.
+    """
+
+    def __init__(self, cap, depth=4, drop_policy="block", keep_color=False, live=False,
+                 start_index=0, crop=None, profiler=None, stride=1):
+        """
+        Parameters
+        ----------
+        cap : cv2.VideoCapture
+            Opened capture; the reader does not release it.
+        depth : int
+            Maximum number of decoded frames waiting in the queue (0 = serial).
+        drop_policy : str
+            What the decoder does when the queue is full:
+            'block'       — wait for the consumer (lossless, for files).
+            'drop_oldest' — discard the stalest queued frame (live cameras).
+            'drop_newest' — discard the frame just decoded.
+        keep_color : bool
+            Also pass the BGR frame downstream (e.g. for annotation).
+        live : bool
+            Treat read failures as transient (retry) instead of end-of-stream.
+        start_index : int
+            Index of the first frame the capture will return (after a seek).
+        crop : tuple or None
+            (x0, y0, x1, y1) sub-image to convert to grayscale; the gray
+            output is only that region. ``color`` stays the full frame.
+        profiler : StageProfiler or None
+            Receives 'decode', 'grab' and 'cvtColor' stage timings.
+        stride : int
+            Deliver every stride-th frame (indices start_index,
+            start_index + stride, ...); the others are only grabbed.
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.cap = cap
+        self.depth = depth
+        self.drop_policy = drop_policy
+        self.keep_color = keep_color
+        self.live = live
+        self.crop = crop
+        self.profiler = profiler or NULL_PROFILER
+        self.stride = max(1, int(stride))
+        self.stats = PipelineStats()
+
+        self._queue = queue.Queue(maxsize=depth) if depth > 0 else None
+        self._stop = threading.Event()
+        self._thread = None
+        self._index = start_index
+        self._skip = 0             # frames to grab before the next read
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self.stats.started_at = time.perf_counter()
+        if self._queue is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.stats.stopped_at = time.perf_counter()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __iter__(self):
+        while True:
+            t0 = time.perf_counter()
+            item = self._next_item()
+            t1 = time.perf_counter()
+            self.stats.wait_time += t1 - t0
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+
+            yield item
+
+            self.stats.consumed += 1
+            self.stats.consume_time += time.perf_counter() - t1
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _next_item(self):
+        if self._queue is None:
+            return self._decode_one()
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._thread is None or not self._thread.is_alive():
+                    try:
+                        return self._queue.get_nowait()
+                    except queue.Empty:
+                        return _END
+
+    def _decode_one(self):
+        """Read and convert one frame; returns _END at end-of-stream."""
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            if self._skip:
+                with self.profiler.stage("grab"):
+                    grabbed = 0
+                    while grabbed < self._skip and self.cap.grab():
+                        grabbed += 1
+                self._index += grabbed
+                self.stats.skipped += grabbed
+                if grabbed < self._skip and not self.live:
+                    return _END
+                self._skip = 0
+            with self.profiler.stage("decode"):
+                ret, frame = self.cap.read()
+            if not ret:
+                if self.live:
+                    time.sleep(0.1)
+                    continue
+                return _END
+            if self.live:
+                timestamp = time.perf_counter()
+            else:
+                timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+            with self.profiler.stage("cvtColor"):
+                if self.crop is not None:
+                    x0, y0, x1, y1 = self.crop
+                    gray = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+                else:
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            item = DecodedFrame(self._index, gray, frame if self.keep_color else None,
+                                timestamp)
+            self._index += 1
+            self._skip = self.stride - 1
+            self.stats.decoded += 1
+            self.stats.decode_time += time.perf_counter() - t0
+            return item
+        return _END
+
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            try:
+                item = self._decode_one()
+            except Exception as exc:
+                # Surface it in the consumer rather than ending the stream early
+                self._put(_Failure(exc))
+                break
+            if not self._put(item) or item is _END:
+                break
+
+    def _put(self, item):
+        """Enqueue according to the drop policy; False if the reader stopped."""
+        if item is _END or isinstance(item, _Failure) or self.drop_policy == "block":
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stats.dropped += 1
+            if self.drop_policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._queue.put_nowait(item)
+        return True
@@ -6,7 +6,6 @@ and confidence metrics into the real-time analysis pipeline.
 """
 
 import threading
-import time
 import cv2
 import numpy as np
 
@@ -19,11 +18,17 @@ from signal_analysis import (
     rms_displacement,
     extract_spectral_peaks,
     signal_snr,
+    resample_uniform,
+    valid_timestamps,
 )
 from baseline_manager import BaselineManager
 from event_detector import EventDetector
 from damage_hypothesis import DamageHypothesis
 from confidence_metrics import ConfidenceMetrics
+from feature_tracker import replenish_features
+from frame_pipeline import FrameReader
+from phase_correlation import PhaseCorrelator, select_patches
+from profiling import StageProfiler
 
 # ---------------------------------------------------------------------------
 # Shared state (protected by _lock)
@@ -48,7 +53,9 @@ _latest_metrics = {
 
 _latest_frame = None
 _signal_buffer = []
+_time_buffer = []        # capture time (s) of each _signal_buffer sample
 _running = False
+_pipeline_stats = None
 
 # Managers
 _baseline_mgr = BaselineManager()
@@ -64,6 +71,24 @@ FPS = 30
 BUFFER_SIZE = 300
 ANALYSIS_WINDOW = 150
 REINIT_EVERY = 90
+REINIT_MODE = "replenish"      # 'full' re-detects every REINIT_EVERY frames
+REPLENISH_GRID = (4, 4)
+
+# Decoder thread → tracker queue. Frames are dropped (oldest first) rather
+# than letting latency build up when tracking falls behind the camera.
+QUEUE_DEPTH = 2
+DROP_POLICY = "drop_oldest"
+
+# Per-stage timers; off by default, toggled at runtime via set_profiling()
+PROFILE = False
+_profiler = StageProfiler(enabled=PROFILE)
+
+# 'lk' tracks corners with pyramidal LK; 'template' tracks TEMPLATE_COUNT
+# patches by phase correlation, which keeps up with high-frame-rate cameras.
+TRACKING_ENGINE = "lk"
+TEMPLATE_SIZE = 64
+TEMPLATE_COUNT = 24
+TEMPLATE_MIN_RESPONSE = 0.2    # ignore patches whose correlation peak is lower
 
 FEATURE_PARAMS = dict(maxCorners=200, qualityLevel=0.01, minDistance=7, blockSize=7)
 LK_PARAMS = dict(
@@ -87,7 +112,7 @@ def start_processing(camera_index=0):
 
 
 def _processing_loop(camera_index):
-    global _latest_frame, _signal_buffer, _latest_metrics
+    global _latest_frame, _signal_buffer, _latest_metrics, _pipeline_stats
 
     cap = cv2.VideoCapture(camera_index)
     if not cap.isOpened():
@@ -98,56 +123,83 @@ def _processing_loop(camera_index):
     actual_fps = cap.get(cv2.CAP_PROP_FPS)
     fps = actual_fps if actual_fps > 5 else FPS
 
-    ret, first_frame = cap.read()
-    if not ret:
+    reader = FrameReader(cap, depth=QUEUE_DEPTH, drop_policy=DROP_POLICY,
+                         keep_color=True, live=True, profiler=_profiler)
+    _pipeline_stats = reader.stats
+    frames = iter(reader.start())
+
+    first = next(frames, None)
+    if first is None:
         with _lock:
             _latest_metrics["status"] = "Camera read error"
         return
 
-    prev_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
+    prev_gray = first.gray
     prev_pts = cv2.goodFeaturesToTrack(prev_gray, mask=None, **FEATURE_PARAMS)
-
-    frame_idx = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            time.sleep(0.1)
-            continue
-
-        frame_idx += 1
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # --- Optical flow ---
-        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(
-            prev_gray, gray, prev_pts, None, **LK_PARAMS
-        )
+    correlator = None
+    if TRACKING_ENGINE == "template":
+        centres = select_patches(prev_gray, TEMPLATE_SIZE, TEMPLATE_COUNT)
+        if len(centres):    # otherwise fall back to LK
+            correlator = PhaseCorrelator(centres, TEMPLATE_SIZE)
+            correlator.reset(prev_gray)
+    frame_rect = (0, 0, prev_gray.shape[1], prev_gray.shape[0])
+    cell_targets = None
+
+    # Count processed frames (not decoded ones) so periodic work still fires
+    # when the decoder drops frames.
+    for frame_idx, decoded in enumerate(frames, start=1):
+        gray = decoded.gray
+        frame = decoded.color
 
         annotated = frame.copy()
+        num_tracked = 0
 
-        if next_pts is not None and np.sum(status) >= 4:
-            good_new = next_pts[status.ravel() == 1]
-            good_old = prev_pts[status.ravel() == 1]
-
-            displacement_y = _get_structural_displacement(good_old, good_new)
-
-            with _lock:
-                _signal_buffer.append(displacement_y)
-                if len(_signal_buffer) > BUFFER_SIZE:
-                    _signal_buffer.pop(0)
-
-            # Draw tracked points
-            for pt in good_new.reshape(-1, 2):
-                cv2.circle(annotated, tuple(pt.astype(int).tolist()), 2, (0, 255, 0), -1)
-
-            prev_gray = gray.copy()
-            prev_pts = good_new.reshape(-1, 1, 2)
+        if correlator is not None:
+            # --- Phase-correlation templates ---
+            num_tracked = _track_templates(correlator, gray, annotated, decoded.timestamp)
         else:
-            prev_pts = cv2.goodFeaturesToTrack(gray, mask=None, **FEATURE_PARAMS)
-            prev_gray = gray.copy()
-
-        if frame_idx % REINIT_EVERY == 0:
-            prev_pts = cv2.goodFeaturesToTrack(gray, mask=None, **FEATURE_PARAMS)
+            # --- Optical flow ---
+            _profiler.observe("features", len(prev_pts))
+            with _profiler.stage("lk_flow"):
+                next_pts, status, _ = cv2.calcOpticalFlowPyrLK(
+                    prev_gray, gray, prev_pts, None, **LK_PARAMS
+                )
+
+            if next_pts is not None and np.sum(status) >= 4:
+                good_new = next_pts[status.ravel() == 1]
+                good_old = prev_pts[status.ravel() == 1]
+
+                displacement_y = _get_structural_displacement(good_old, good_new)
+                num_tracked = len(good_new)
+                _push_sample(displacement_y, decoded.timestamp)
+
+                # Draw tracked points
+                for pt in good_new.reshape(-1, 2):
+                    cv2.circle(annotated, tuple(pt.astype(int).tolist()), 2, (0, 255, 0), -1)
+
+                prev_gray = gray
+                prev_pts = good_new.reshape(-1, 1, 2)
+            else:
+                with _profiler.stage("detect_features"):
+                    prev_pts = cv2.goodFeaturesToTrack(gray, mask=None, **FEATURE_PARAMS)
+                prev_gray = gray
+                cell_targets = None
+
+            if REINIT_MODE == "replenish":
+                # Top up only grid cells that lost tracks instead of a full re-detect
+                if prev_pts is not None:
+                    with _profiler.stage("replenish"):
+                        new_pts, cell_targets = replenish_features(
+                            gray, prev_pts, frame_rect, FEATURE_PARAMS,
+                            targets=cell_targets, grid=REPLENISH_GRID,
+                        )
+                    if len(new_pts):
+                        prev_pts = np.concatenate(
+                            [prev_pts.reshape(-1, 2), new_pts]
+                        ).reshape(-1, 1, 2)
+            elif frame_idx % REINIT_EVERY == 0:
+                with _profiler.stage("detect_features"):
+                    prev_pts = cv2.goodFeaturesToTrack(gray, mask=None, **FEATURE_PARAMS)
 
         # --- Overlay metrics on frame ---
         with _lock:
@@ -186,28 +238,59 @@ def _processing_loop(camera_index):
 
         # --- Periodic analysis (every ~1 s) ---
         if frame_idx % int(fps) == 0:
-            _run_analysis(fps, len(good_new) if next_pts is not None else 0)
-
-        time.sleep(max(0, 1.0 / fps - 0.002))
+            with _profiler.stage("analysis"):
+                _run_analysis(fps, num_tracked)
 
+    reader.stop()
     cap.release()
 
 
+def _push_sample(displacement_y, timestamp):
+    with _lock:
+        _signal_buffer.append(displacement_y)
+        _time_buffer.append(timestamp)
+        if len(_signal_buffer) > BUFFER_SIZE:
+            _signal_buffer.pop(0)
+            _time_buffer.pop(0)
+
+
+def _track_templates(correlator, gray, annotated, timestamp):
+    """One phase-correlation step; appends to the signal buffer, returns patches used."""
+    _profiler.observe("features", len(correlator))
+    with _profiler.stage("phase_correlate"):
+        shifts, response = correlator.update(gray)
+    good = response >= TEMPLATE_MIN_RESPONSE
+    if not good.any():
+        return 0
+
+    centres = correlator.centres[good]
+    displacement_y = _get_structural_displacement(centres, centres + shifts[good])
+    _push_sample(displacement_y, timestamp)
+
+    half = correlator.size // 2
+    for x, y in centres.astype(int).tolist():
+        cv2.rectangle(annotated, (x - half, y - half), (x + half, y + half), (0, 255, 0), 1)
+    return int(good.sum())
+
+
 def _get_structural_displacement(pts_old, pts_new):
     """Homography-compensated vertical displacement."""
     pts_old = pts_old.reshape(-1, 2).astype(np.float32)
     pts_new = pts_new.reshape(-1, 2).astype(np.float32)
 
     if len(pts_old) >= 8:
-        H, mask = cv2.findHomography(
-            pts_old.reshape(-1, 1, 2),
-            pts_new.reshape(-1, 1, 2),
-            cv2.RANSAC, 3.0
-        )
-        if H is not None:
-            predicted = cv2.perspectiveTransform(
-                pts_old.reshape(-1, 1, 2), H
+        with _profiler.stage("find_homography"):
+            H, mask = cv2.findHomography(
+                pts_old.reshape(-1, 1, 2),
+                pts_new.reshape(-1, 1, 2),
+                cv2.RANSAC, 3.0
             )
+        if H is not None:
+            _profiler.observe("ransac_inlier_ratio", float(mask.mean()))
+            with _profiler.stage("perspective_transform"):
+                predicted = cv2.perspectiveTransform(
+                    pts_old.reshape(-1, 1, 2), H
+                )
             structural = pts_new - predicted.reshape(-1, 2)
             return float(np.median(structural[:, 1]))
 
@@ -221,11 +304,17 @@ def _run_analysis(fps, num_features):
 
     with _lock:
         buf = list(_signal_buffer)
+        times = list(_time_buffer)
 
     if len(buf) < ANALYSIS_WINDOW:
         return
 
     signal = np.array(buf[-ANALYSIS_WINDOW:], dtype=np.float64)
+    times = np.array(times[-ANALYSIS_WINDOW:], dtype=np.float64)
+    if valid_timestamps(times):
+        # Camera jitter and dropped frames make the sampling irregular;
+        # analyse on a uniform grid at the rate actually achieved.
+        signal, fps = resample_uniform(times, signal, cumulative=True)
 
     try:
         signal = highpass_filter(signal, fps, cutoff=0.5)
@@ -327,6 +416,25 @@ def get_latest_frame():
         return _latest_frame
 
 
+def get_pipeline_stats():
+    """Per-stage throughput of the decode → track pipeline (None if idle)."""
+    stats = _pipeline_stats
+    return stats.summary() if stats is not None else None
+
+
+def get_profile():
+    """Per-stage timing histograms of the live loop (see profiling.py)."""
+    return _profiler.summary()
+
+
+def set_profiling(enabled, reset=False):
+    """Turn stage timing on or off at runtime; optionally clear past samples."""
+    if reset:
+        _profiler.reset()
+    _profiler.enabled = bool(enabled)
+    return _profiler.enabled
+
+
 # ---------------------------------------------------------------------------
 # Baseline management API
 # ---------------------------------------------------------------------------
@@ -8,6 +8,20 @@ Usage
 -----
     python main.py [--video PATH] [--cutoff HZ] [--scale MM_PER_PIXEL]
                    [--start FRAME] [--end FRAME] [--method log_decrement|envelope]
+                   [--roi X Y W H | --member NAME X Y W H ...] [--roi-crop]
+                   [--queue-depth N] [--workers N] [--chunk-frames N]
+                   [--save-tracks PATH.npz|DIR]
+                   [--cache-dir DIR] [--cache-size-mb MB] [--no-cache]
+                   [--checkpoint-every N] [--checkpoint-dir DIR] [--resume]
+                   [--profile] [--fb-threshold PX] [--ransac-iters N] [--max-corners N]
+                   [--predict-flow] [--motion-model MODEL] [--motion-subsample N]
+                   [--motion-prior] [--motion-points background|all]
+                   [--engine sparse|dense|template] [--dense-method dis|farneback]
+                   [--dense-preset PRESET] [--dense-scale S] [--dense-cell PX]
+                   [--template-size PX] [--template-count N]
+                   [--stride N] [--max-freq HZ]
+                   [--components x|y|magnitude|rotation ...] [--aggregate mad|huber|tukey]
+                   [--absolute] [--grid ROWS COLS]
 
 Output
 ------
@@ -16,16 +30,34 @@ Output
         fft.png            — FFT frequency spectrum
         psd.png            — Welch PSD (more reliable for short signals)
         report.txt         — summary of key metrics
+        (--save-tracks)    — per-feature track histories (see track_store.py)
+        profile.json       — per-stage timings (with --profile)
+        cache/             — reusable tracking results (unless --no-cache)
+        grid_displacement.npy — (T, cells) per-cell displacement in px (with --grid)
+        ods.csv            — operating deflection shapes at the spectral peaks (with --grid)
 """
 
 import os
+import json
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 
-from feature_tracker import VibrationTracker
-from motion_compensation import compensate_motion
+from feature_tracker import DENSE_PRESETS, ENGINES, split_by_roi
+from parallel_tracking import ParallelVibrationTracker
+from motion_compensation import (
+    AGGREGATION_METHODS,
+    COMPONENTS,
+    compensate_motion,
+    compensate_motion_by_roi,
+    aggregate_grid,
+)
+from track_store import TrackStore
+from tracking_cache import CachedTracker, TrackingCache
+from checkpoint import ResumableTracker
+from profiling import StageProfiler
+from motion_models import MOTION_MODELS
 from signal_analysis import (
     smooth_signal,
     compute_fft,
@@ -37,6 +69,13 @@ from signal_analysis import (
     estimate_damping,
     signal_snr,
     rms_displacement,
+    aliasing_warning,
+    resample_uniform,
+    timestamps_uniform,
+    valid_timestamps,
+    fill_missing,
+    hold_missing,
+    operating_deflection_shapes,
 )
 from calibration import pixel_to_mm
 from utils import save_plot
@@ -46,7 +85,7 @@ from utils import save_plot
 # CLI
 # --------------------------------------------------------------------------
 
-def parse_args():
+def parse_args(argv=None):
     p = argparse.ArgumentParser(description="Structural Vibration Analysis")
     p.add_argument("--video",   default="data/test_video.mp4")
     p.add_argument("--cutoff",  type=float, default=1.0,  help="High-pass cutoff Hz")
@@ -55,7 +94,110 @@ def parse_args():
     p.add_argument("--end",     type=int,   default=None, help="Damping segment end frame")
     p.add_argument("--method",  default="log_decrement",  help="Damping method")
     p.add_argument("--results", default="results")
-    return p.parse_args()
+    p.add_argument("--roi", type=int, nargs=4, default=None, metavar=("X", "Y", "W", "H"),
+                   help="Structure region of interest in pixels")
+    p.add_argument("--member", nargs=5, action="append", default=None,
+                   metavar=("NAME", "X", "Y", "W", "H"),
+                   help="Named ROI tracked in the same pass (repeatable, replaces --roi); "
+                        "the first member drives the detailed analysis")
+    p.add_argument("--roi-crop", action="store_true",
+                   help="Decode-convert and track only a padded crop around --roi")
+    p.add_argument("--queue-depth", type=int, default=4,
+                   help="Frames decoded ahead on a background thread (0 = serial)")
+    p.add_argument("--workers", type=int, default=1,
+                   help="Track frame chunks in N processes (1 = single pass)")
+    p.add_argument("--chunk-frames", type=int, default=1800,
+                   help="Frames per chunk when --workers > 1")
+    p.add_argument("--save-tracks", default=None, metavar="PATH",
+                   help="Save per-feature track histories (.npz, or a directory of .npy)")
+    p.add_argument("--cache-dir", default=None,
+                   help="Reuse tracking results across runs with the same video and settings "
+                        "(default: <results>/cache)")
+    p.add_argument("--cache-size-mb", type=float, default=2048,
+                   help="Evict least-recently-used cache entries beyond this size")
+    p.add_argument("--no-cache", action="store_true", help="Always re-track the video")
+    p.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                   help="Checkpoint tracking every N frames (0 = off, 1800 with --resume)")
+    p.add_argument("--checkpoint-dir", default=None,
+                   help="Checkpoint directory (default: <results>/checkpoint)")
+    p.add_argument("--resume", action="store_true",
+                   help="Continue tracking from the last checkpoint")
+    p.add_argument("--profile", action="store_true",
+                   help="Time each tracking stage and write profile.json")
+    p.add_argument("--fb-threshold", type=float, default=None, metavar="PX",
+                   help="Drop tracks whose forward-backward LK round trip exceeds PX")
+    p.add_argument("--ransac-iters", type=int, default=2000,
+                   help="RANSAC iteration cap for the camera-motion homography")
+    p.add_argument("--max-corners", type=int, default=400,
+                   help="Corner budget per ROI")
+    p.add_argument("--predict-flow", action="store_true",
+                   help="Seed LK with constant-velocity predictions (fewer levels/iterations)")
+    p.add_argument("--motion-model", default="homography", choices=MOTION_MODELS,
+                   help="Camera-motion model ('auto' escalates from translation)")
+    p.add_argument("--motion-subsample", type=int, default=None, metavar="N",
+                   help="Fit camera motion on at most N points")
+    p.add_argument("--motion-prior", action="store_true",
+                   help="Refine the previous frame's camera model instead of re-running RANSAC")
+    p.add_argument("--motion-points", default="background", choices=["background", "all"],
+                   help="With an ROI, fit camera motion on background points only, or on all")
+    p.add_argument("--engine", default="sparse", choices=list(ENGINES),
+                   help="Sparse LK corners, dense flow averaged over sensor cells, or "
+                        "phase-correlation templates (high frame rates)")
+    p.add_argument("--dense-method", default="dis", choices=["dis", "farneback"],
+                   help="Dense flow algorithm (--engine dense)")
+    p.add_argument("--dense-preset", default="fast", choices=list(DENSE_PRESETS),
+                   help="DIS optical-flow preset (--engine dense)")
+    p.add_argument("--dense-scale", type=float, default=0.5,
+                   help="Resolution the dense flow is computed at (--engine dense)")
+    p.add_argument("--dense-cell", type=int, default=32, metavar="PX",
+                   help="Virtual sensor cell size in pixels (--engine dense)")
+    p.add_argument("--template-size", type=int, default=64, metavar="PX",
+                   help="Patch side, ideally a power of two (--engine template)")
+    p.add_argument("--template-count", type=int, default=16, metavar="N",
+                   help="Patches per ROI and on the background (--engine template)")
+    p.add_argument("--stride", type=int, default=1, metavar="N",
+                   help="Preview mode: analyse every N-th frame (skipped frames are only "
+                        "grabbed); the effective fps is fps / N")
+    p.add_argument("--max-freq", type=float, default=None, metavar="HZ",
+                   help="Highest frequency of interest, checked against the effective Nyquist")
+    p.add_argument("--components", nargs="+", default=["y"], choices=list(COMPONENTS),
+                   help="Displacement components aggregated in the tracking pass; 'y' "
+                        "drives the analysis, the others are summarized (rotation about "
+                        "the ROI centroid in mrad)")
+    p.add_argument("--aggregate", default="mad", choices=list(AGGREGATION_METHODS),
+                   help="Per-frame aggregation: MAD-trimmed mean, or Huber/Tukey IRLS "
+                        "weighted by tracking error (fewer corners for the same noise)")
+    p.add_argument("--absolute", action="store_true",
+                   help="Analyse each feature's displacement from its track anchor "
+                        "(re-anchored at re-detection) instead of frame-to-frame deltas")
+    p.add_argument("--grid", type=int, nargs=2, default=None, metavar=("ROWS", "COLS"),
+                   help="Also aggregate 'y' per cell of a ROWS x COLS grid over the ROI "
+                        "(first member) and export operating deflection shapes")
+    args = p.parse_args(argv)
+    if args.resume and not args.checkpoint_every:
+        args.checkpoint_every = 1800
+    if args.checkpoint_every and args.workers > 1:
+        p.error("--checkpoint-every/--resume require --workers 1")
+    if args.profile and args.workers > 1:
+        p.error("--profile requires --workers 1")
+    if args.engine != "sparse" and args.workers > 1:
+        p.error(f"--engine {args.engine} requires --workers 1")
+    if args.stride < 1:
+        p.error("--stride must be >= 1")
+    if args.stride > 1 and args.workers > 1:
+        p.error("--stride requires --workers 1")
+    if args.absolute and "rotation" in args.components:
+        p.error("--components rotation requires frame-to-frame displacements (no --absolute)")
+    if args.grid is not None:
+        if not args.roi and not args.member:
+            p.error("--grid requires --roi or --member")
+        if min(args.grid) < 1:
+            p.error("--grid needs at least one row and one column")
+    if args.checkpoint_dir is None:
+        args.checkpoint_dir = os.path.join(args.results, "checkpoint")
+    if args.cache_dir is None:
+        args.cache_dir = os.path.join(args.results, "cache")
+    return args
 
 
 # --------------------------------------------------------------------------
@@ -151,22 +293,203 @@ def plot_overview(t, signal, freqs, mags, psd_f, psd, dom_freq, dom_mag, results
 # Main pipeline
 # --------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def summarize_member(raw_signal, fps, args, scale=None):
+    """
+    Dominant Welch frequency and RMS (mm) of one member's raw signal;
+    ``scale`` overrides ``args.scale`` (e.g. rad → mrad for rotation).
+    """
+    filtered = highpass_filter(smooth_signal(raw_signal, window=5), fps, cutoff=args.cutoff)
+    physical = pixel_to_mm(filtered, args.scale if scale is None else scale)
+    freqs, psd = compute_welch_psd(physical, fps)
+    freq, _ = dominant_frequency(freqs, psd)
+    return freq, rms_displacement(physical)
+
+
+def collect_timestamps(frames, times):
+    """Pass ``TrackedFrame`` items through, appending each timestamp to ``times``."""
+    for tracked in frames:
+        times.append(np.nan if tracked.timestamp is None else tracked.timestamp)
+        yield tracked
+
+
+def collect_grid(frames, rect, shape, chunks, absolute=False, method="mad",
+                 batch_frames=4096):
+    """
+    Pass ``TrackedFrame`` items through, appending the per-cell 'y'
+    displacement of each batch of frames (``aggregate_grid``) to ``chunks``.
+    """
+    batch = []
+    for tracked in frames:
+        batch.append((tracked.absolute if absolute else tracked.displacements,
+                      tracked.points, tracked.errors, tracked.inliers))
+        yield tracked
+        if len(batch) == batch_frames:
+            chunks.append(aggregate_grid(batch, rect, shape, method=method))
+            batch = []
+    if batch:
+        chunks.append(aggregate_grid(batch, rect, shape, method=method))
+
+
+def save_ods(path, rect, shape, bin_freqs, amplitudes, shapes):
+    """Write operating deflection shapes as one CSV row per (frequency, cell)."""
+    rows, cols = shape
+    x0, y0, w, h = rect
+    with open(path, "w") as f:
+        f.write("freq_hz,cell,row,col,x,y,amplitude_mm,shape_magnitude,shape_phase_deg\n")
+        for freq, amps, shape_k in zip(bin_freqs, amplitudes, shapes):
+            for cell, (amp, value) in enumerate(zip(amps, shape_k)):
+                r, c = divmod(cell, cols)
+                f.write(f"{freq:.4f},{cell},{r},{c},{x0 + (c + 0.5) * w / cols:.1f},"
+                        f"{y0 + (r + 0.5) * h / rows:.1f},{amp:.6f},{abs(value):.4f},"
+                        f"{np.degrees(np.angle(value)):.1f}\n")
+
+
+def main(argv=None):
+    """
+    Run the full offline pipeline; ``argv`` defaults to the command line.
+
+    Returns
+    -------
+    dict with the headline results (frames, fps, dom_freq, dom_freq_psd,
+    top_freqs, damping, rms, snr, members, components, ods) for programmatic
+    callers such as ``benchmarks.tracker_suite``.
+    """
+    args = parse_args(argv)
     results_dir = args.results
     os.makedirs(results_dir, exist_ok=True)
 
     print("\n=== Structural Vision Monitor ===\n")
 
-    # --- 1. Track features ---
+    # --- 1–2. Track features and aggregate to scalar signal ---
+    # Streamed frame by frame so memory stays bounded by the output signal.
     print("[1/6] Tracking features...")
-    tracker = VibrationTracker(args.video)
-    displacements, fps = tracker.run()
-    print(f"      Video: {len(displacements)} frames @ {fps:.1f} fps")
-
-    # --- 2. Aggregate to scalar signal ---
     print("[2/6] Aggregating displacement signal...")
-    raw_signal = compensate_motion(displacements, axis="y")
+    members = None
+    if args.member:
+        members = {m[0]: tuple(int(v) for v in m[1:]) for m in args.member}
+    tracker_kwargs = dict(
+        roi=tuple(args.roi) if args.roi and not members else None,
+        rois=members,
+        roi_crop=args.roi_crop,
+        pipeline_depth=args.queue_depth,
+        fb_threshold=args.fb_threshold,
+        ransac_max_iters=args.ransac_iters,
+        max_corners=args.max_corners,
+        predict_flow=args.predict_flow,
+        motion_model=args.motion_model,
+        motion_subsample=args.motion_subsample,
+        motion_prior=args.motion_prior,
+        motion_points=args.motion_points,
+        stride=args.stride,
+    )
+    if args.engine == "dense":
+        tracker_kwargs.update(
+            dense_method=args.dense_method,
+            dense_preset=args.dense_preset,
+            dense_scale=args.dense_scale,
+            dense_cell=args.dense_cell,
+        )
+    elif args.engine == "template":
+        tracker_kwargs.update(
+            template_size=args.template_size,
+            template_count=args.template_count,
+        )
+    profiler = None
+    if args.profile:
+        profiler = tracker_kwargs["profiler"] = StageProfiler()
+    if args.workers > 1:
+        tracker = ParallelVibrationTracker(args.video, workers=args.workers,
+                                           chunk_frames=args.chunk_frames,
+                                           **tracker_kwargs)
+    else:
+        tracker = ENGINES[args.engine](args.video, **tracker_kwargs)
+    resumable = None
+    if args.checkpoint_every:
+        resumable = tracker = ResumableTracker(tracker, args.checkpoint_dir,
+                                               interval=args.checkpoint_every,
+                                               resume=args.resume)
+    if not args.no_cache:
+        cache = TrackingCache(args.cache_dir, max_bytes=int(args.cache_size_mb * 2 ** 20))
+        tracker = CachedTracker(tracker, cache)
+    frames = tracker.iter_frames()
+    store = None
+    if args.save_tracks:
+        store = TrackStore()
+        frames = store.record(frames)
+    times = []
+    frames = collect_timestamps(frames, times)
+    grid_chunks = []
+    if args.grid:
+        grid_rect = tuple(args.roi) if not members else members[args.member[0][0]]
+        frames = collect_grid(frames, grid_rect, tuple(args.grid), grid_chunks,
+                              absolute=args.absolute, method=args.aggregate)
+    # Every requested component comes out of the same pass over the frames
+    axes = ("y",) + tuple(dict.fromkeys(c for c in args.components if c != "y"))
+    # No tracks means no motion between frames, but an unknown absolute level
+    empty = np.nan if args.absolute else 0.0
+    if members:
+        names = tracker.roi_names
+        member_parts = compensate_motion_by_roi(
+            (split_by_roi(t, names, full=True, absolute=args.absolute) for t in frames),
+            axis=axes, method=args.aggregate, empty=empty)
+        member_signals = {name: parts["y"] for name, parts in member_parts.items()}
+        parts = member_parts[args.member[0][0]]
+    else:
+        member_signals = {}
+        parts = compensate_motion(
+            ((t.absolute if args.absolute else t.displacements, t.points, t.errors, t.inliers)
+             for t in frames),
+            axis=axes, method=args.aggregate, empty=empty)
+    raw_signal = parts["y"]
+    component_signals = {name: parts[name] for name in axes[1:]}
+    if args.absolute:
+        raw_signal = hold_missing(raw_signal)
+        member_signals = {name: hold_missing(sig) for name, sig in member_signals.items()}
+        component_signals = {name: hold_missing(sig) for name, sig in component_signals.items()}
+    grid_signal = None
+    if args.grid:
+        # Empty cells would carry NaN through resampling and the FFT
+        grid_signal = fill_missing(np.concatenate(grid_chunks))
+    fps = tracker.fps
+    source_fps = fps * args.stride     # before any resampling replaces fps
+    n_frames = len(raw_signal)
+    print(f"      Video: {n_frames} frames @ {fps:.1f} fps")
+    if args.stride > 1 or args.max_freq is not None:
+        warning = aliasing_warning(fps, args.max_freq, source_fps=source_fps)
+        if warning:
+            print(f"      Warning: {warning}")
+    if getattr(tracker, "hit", False):
+        print(f"      Reused cached tracking from {args.cache_dir}")
+    elif tracker.pipeline_stats is not None:
+        stages = tracker.pipeline_stats.summary()
+        print(f"      Throughput: decode {stages['decode_fps']:.1f} fps | "
+              f"track {stages['track_fps']:.1f} fps | "
+              f"overall {stages['throughput_fps']:.1f} fps")
+    if resumable is not None and resumable.resumed_frames:
+        print(f"      Resumed after {resumable.resumed_frames} checkpointed frames")
+    if store is not None:
+        store.fps = fps
+        store.save(args.save_tracks)
+        print(f"      Saved {len(store.track_ids())} tracks to {args.save_tracks}")
+
+    # Variable frame rate / dropped frames: move onto a uniform time grid
+    # before any filtering or spectral analysis assumes a constant fps.
+    # Frame-to-frame deltas are resampled as increments, absolute ones as levels.
+    if valid_timestamps(times) and not timestamps_uniform(times):
+        deltas = not args.absolute
+        raw_signal, fps = resample_uniform(times, raw_signal, cumulative=deltas)
+        member_signals = {
+            name: resample_uniform(times, sig, fps=fps, cumulative=deltas)[0]
+            for name, sig in member_signals.items()
+        }
+        component_signals = {
+            name: resample_uniform(times, sig, fps=fps, cumulative=deltas)[0]
+            for name, sig in component_signals.items()
+        }
+        if grid_signal is not None:
+            grid_signal = resample_uniform(times, grid_signal, fps=fps, cumulative=deltas)[0]
+        print(f"      Irregular frame timing: resampled to {len(raw_signal)} samples "
+              f"@ {fps:.2f} fps")
 
     # --- 3. Filter ---
     print("[3/6] Filtering (high-pass)...")
@@ -215,6 +538,27 @@ def main():
     print(f"  RMS displacement          : {rms:.4f} mm")
     print(f"  Estimated SNR             : {snr:.1f} dB")
     print(f"  Analysis window           : frames {start_f}–{end_f}")
+    member_summary = {
+        name: summarize_member(sig, fps, args) for name, sig in member_signals.items()
+    }
+    for name, (m_freq, m_rms) in member_summary.items():
+        print(f"  Member {name:<18} : {m_freq:.3f} Hz, RMS {m_rms:.4f} mm")
+    component_summary = {
+        name: summarize_member(sig, fps, args, scale=1e3 if name == "rotation" else None)
+        for name, sig in component_signals.items()
+    }
+    for name, (c_freq, c_rms) in component_summary.items():
+        unit = "mrad" if name == "rotation" else "mm"
+        print(f"  Component {name:<15} : {c_freq:.3f} Hz, RMS {c_rms:.4f} {unit}")
+    ods = None
+    if grid_signal is not None:
+        ods_freqs = [f for f, _ in top_freqs] or [dom_freq]
+        ods = operating_deflection_shapes(pixel_to_mm(grid_signal, args.scale), fps, ods_freqs)
+        rows, cols = args.grid
+        for freq, amps in zip(ods[0], ods[1]):
+            peak = int(np.nanargmax(amps)) if not np.isnan(amps).all() else 0
+            print(f"  ODS at {freq:6.3f} Hz          : peak cell ({peak // cols}, "
+                  f"{peak % cols}) of {rows}x{cols}, {amps[peak]:.4f} mm")
     print("─────────────────────────────────────────\n")
 
     # --- Plots ---
@@ -231,8 +575,12 @@ def main():
         f.write("Structural Vibration Monitor — Analysis Report\n")
         f.write("=" * 50 + "\n\n")
         f.write(f"Video              : {args.video}\n")
-        f.write(f"Frames             : {len(displacements)}\n")
+        f.write(f"Frames             : {n_frames}\n")
         f.write(f"FPS                : {fps:.2f}\n")
+        if args.stride > 1:
+            f.write(f"Stride             : {args.stride} (source {source_fps:.2f} fps)\n")
+        if args.absolute:
+            f.write("Displacement       : absolute (from track anchors)\n")
         f.write(f"Scale factor       : {args.scale} mm/px\n")
         f.write(f"High-pass cutoff   : {args.cutoff} Hz\n\n")
         f.write(f"Dominant freq (FFT)  : {dom_freq:.3f} Hz\n")
@@ -241,9 +589,47 @@ def main():
         f.write(f"Damping ratio (zeta) : {damping:.4f}\n" if damping else "Damping ratio : N/A\n")
         f.write(f"RMS displacement     : {rms:.4f} mm\n")
         f.write(f"SNR estimate         : {snr:.1f} dB\n")
+        for name, (m_freq, m_rms) in member_summary.items():
+            f.write(f"Member {name:<13} : {m_freq:.3f} Hz (Welch), RMS {m_rms:.4f} mm\n")
+        for name, (c_freq, c_rms) in component_summary.items():
+            unit = "mrad" if name == "rotation" else "mm"
+            f.write(f"Component {name:<10} : {c_freq:.3f} Hz (Welch), RMS {c_rms:.4f} {unit}\n")
+        if ods is not None:
+            f.write(f"ODS grid           : {args.grid[0]}x{args.grid[1]} cells, "
+                    f"{len(ods[0])} frequencies (ods.csv)\n")
     print(f"  Saved: {report_path}")
+    if ods is not None:
+        grid_path = os.path.join(results_dir, "grid_displacement.npy")
+        np.save(grid_path, grid_signal)
+        ods_path = os.path.join(results_dir, "ods.csv")
+        save_ods(ods_path, grid_rect, tuple(args.grid), *ods)
+        print(f"  Saved: {grid_path}, {ods_path}")
+
+    if profiler is not None:
+        print("\n─── Tracking profile ──────────────────────")
+        print(profiler.format())
+        profile = profiler.summary()
+        if tracker.pipeline_stats is not None:
+            profile["pipeline"] = tracker.pipeline_stats.summary()
+        profile_path = os.path.join(results_dir, "profile.json")
+        with open(profile_path, "w") as f:
+            json.dump(profile, f, indent=2)
+        print(f"  Saved: {profile_path}")
 
     print("\n✓ Processing complete. Results saved to:", results_dir)
+    return {
+        "frames": n_frames,
+        "fps": fps,
+        "dom_freq": dom_freq,
+        "dom_freq_psd": dom_freq_psd,
+        "top_freqs": top_freqs,
+        "damping": damping,
+        "rms": rms,
+        "snr": snr,
+        "members": member_summary,
+        "components": component_summary,
+        "ods": ods,
+    }
 
 
 if __name__ == "__main__":
@@ -1,7 +1,30 @@
+from itertools import islice
+
 import numpy as np
+from numpy.lib import recfunctions
+
+
+# Per-frame components compensate_motion can extract in one pass
+COMPONENTS = ("x", "y", "magnitude", "rotation")
+
+# 'mad': mean of the points within 3 MADs of the median (the original rule);
+# 'huber' / 'tukey': IRLS M-estimates weighted by each point's tracking error
+AGGREGATION_METHODS = ("mad", "huber", "tukey")
+
+# Tuning constants (in robust standard deviations) for 95% Gaussian efficiency
+IRLS_TUNING = {"huber": 1.345, "tukey": 4.685}
+
+# Steepness of the tracking-error prior: features with twice their frame's
+# median LK error get ~1/250 of the weight, so it acts as a soft inlier flag
+ERROR_WEIGHT_POWER = 8
+
+# Prior weight of a feature outside the camera model's reprojection threshold
+# (a gross LK failure: frame-to-frame structural motion is far below it)
+OUTLIER_WEIGHT = 0.01
 
 
-def compensate_motion(displacements, axis="y"):
+def compensate_motion(displacements, axis="y", batch_frames=4096, method="mad", max_iter=10,
+                      empty=0.0):
     """
     Aggregate per-frame feature displacement vectors into a scalar signal.
 
@@ -10,38 +33,450 @@ def compensate_motion(displacements, axis="y"):
 
     Parameters
     ----------
-    displacements : list of np.ndarray  shape (N_i, 2)
-        Output from VibrationTracker.run().
-    axis : str
+    displacements : iterable of np.ndarray  shape (N_i, 2)
+        Output from VibrationTracker.run() or iter_displacements().  Items
+        may also be (displacements, points[, errors[, inliers]]) tuples with
+        the (N_i, 2) feature positions, as 'rotation' requires, and the
+        (N_i,) tracking errors and camera-model inlier flags that weight the
+        'huber' and 'tukey' methods.
+    axis : str or sequence of str
         'y' for vertical vibration, 'x' for horizontal, 'magnitude' for L2 norm.
+        A sequence of COMPONENTS (which adds 'rotation', the in-plane
+        rotation about the features' centroid) extracts all of them from
+        the same pass.
+    batch_frames : int
+        Frames aggregated together by ``aggregate_frames``; bounds the
+        memory held at once for long recordings.
+    method : str
+        One of AGGREGATION_METHODS.  'huber' and 'tukey' need fewer
+        features for the same noise floor when tracking errors are given.
+    max_iter : int
+        IRLS iteration cap for 'huber' and 'tukey'.
+    empty : float
+        Value for frames without features: 0.0 (no motion) suits
+        frame-to-frame deltas; absolute levels are unknown there, so pass
+        NaN and hold the previous level (``signal_analysis.hold_missing``).
 
     Returns
     -------
     signal : np.ndarray  shape (T,)
-        Scalar displacement per frame.
+        Scalar displacement per frame, identical to ``aggregate_frame``
+        applied to each frame in turn.  For a sequence of components, a
+        structured array with one float64 field per component.
     """
-    axis_idx = {"x": 0, "y": 1}.get(axis, 1)
-    signal = []
+    displacements = iter(displacements)
+    chunks = []
+    while True:
+        batch = list(islice(displacements, batch_frames))
+        if not batch:
+            break
+        chunks.append(aggregate_frames(batch, axis=axis, method=method, max_iter=max_iter,
+                                       empty=empty))
+    return _as_signal(chunks, axis)
+
+
+def compensate_motion_by_roi(frames, axis="y", batch_frames=4096, method="mad", max_iter=10,
+                             empty=0.0):
+    """
+    Per-ROI ``compensate_motion`` over a single pass of a multi-ROI stream.
+
+    Parameters
+    ----------
+    frames : iterable of dict  {roi name: np.ndarray (N_i, 2)}
+        Output from VibrationTracker.iter_roi_displacements(), or
+        ``split_by_roi(..., full=True)`` for (displacements, points, errors,
+        inliers).
+    axis, batch_frames, method, max_iter, empty : as in ``compensate_motion``.
+
+    Returns
+    -------
+    signals : dict  {roi name: np.ndarray shape (T,)}
+    """
+    pending, signals = {}, {}
+
+    def flush(name):
+        signals.setdefault(name, []).append(
+            aggregate_frames(pending.pop(name), axis=axis, method=method, max_iter=max_iter,
+                             empty=empty))
+
+    for frame in frames:
+        for name, frame_disp in frame.items():
+            pending.setdefault(name, []).append(frame_disp)
+            if len(pending[name]) >= batch_frames:
+                flush(name)
+    for name in list(pending):
+        flush(name)
+    return {name: _as_signal(chunks, axis) for name, chunks in signals.items()}
+
+
+def aggregate_frames(frames, axis="y", method="mad", max_iter=10, empty=0.0):
+    """
+    ``aggregate_frame`` over a list of frames in a few array operations.
+
+    The ragged (N_i, 2) arrays are packed into one (F, max N_i) block padded
+    with +inf, so a single row-wise sort gives every frame's median and MAD
+    as order statistics.  Inliers are then compacted in their original
+    order and averaged row-wise, so each value is bit-identical to the
+    per-frame ``aggregate_frame``.
+
+    With ``method`` 'huber' or 'tukey' each frame is instead an M-estimate
+    found by iteratively reweighted least squares over the same block (see
+    ``_aggregate_irls``), with each feature's tracking error and camera-model
+    inlier flag, when given, as a prior weight.
 
-    for frame_disp in displacements:
-        if frame_disp is None or len(frame_disp) == 0:
-            signal.append(0.0)
+    Rotation is the robust mean of each feature's small-angle rotation
+    ``cross(r, d - t) / |r|²`` about the centroid of the features'
+    previous positions, where ``t`` is the frame's robust translation.
+    It is in radians, positive clockwise on screen (image y points down).
+
+    Returns
+    -------
+    np.ndarray  (len(frames),) float64, or (len(frames), C) for a sequence
+    of C components
+    """
+    single = isinstance(axis, str)
+    components = (axis,) if single else tuple(axis)
+    for name in components:
+        if not single and name not in COMPONENTS:
+            raise ValueError(f"Unknown component: {name}")
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation method: {method}")
+
+    out = np.full((len(frames), len(components)), empty, dtype=np.float64)
+    items = [f if isinstance(f, tuple) else (f,) for f in frames]
+    present = [i for i, item in enumerate(items) if item[0] is not None and len(item[0]) > 0]
+    disps = {i: np.asarray(items[i][0]).reshape(-1, 2) for i in present}
+
+    # Packing would promote mixed dtypes and change the rounding
+    for dtype in {d.dtype for d in disps.values()}:
+        group = [i for i in present if disps[i].dtype == dtype]
+        points = None
+        if "rotation" in components:
+            if all(len(items[i]) < 2 for i in group):
+                raise ValueError("'rotation' needs (displacements, points) pairs")
+            points = np.concatenate([_matching(items[i][1] if len(items[i]) > 1 else None,
+                                               disps[i], (2,)) for i in group])
+        errors = inliers = None
+        if method != "mad":
+            errors, inliers = _gather(items, group, disps, 2), _gather(items, group, disps, 3)
+        flat = np.concatenate([disps[i] for i in group])
+        counts = np.fromiter((len(disps[i]) for i in group), dtype=np.int64, count=len(group))
+        out[group] = _aggregate_group(flat, counts, points, errors, inliers, components,
+                                      method, max_iter)
+    return out[:, 0] if single else out
+
+
+def aggregate_grid(frames, rect, shape, axis="y", method="mad", max_iter=10):
+    """
+    Per-cell ``aggregate_frame`` of a list of frames binned onto a grid.
+
+    Collapsing every feature into one scalar per frame discards where on
+    the structure the motion happened; the per-cell values are the
+    displacement field operating deflection shapes are extracted from.
+
+    Each feature is assigned to the cell of ``rect`` its current position
+    falls in; features are then regrouped into one run per (frame, cell)
+    and every run is aggregated in the same packed pass as
+    ``aggregate_frames``, so a cell's value is bit-identical to
+    ``aggregate_frame`` on that cell's features alone.
+
+    Parameters
+    ----------
+    frames : list of tuple  (displacements, points[, errors[, inliers]])
+        As for ``compensate_motion``; positions are required.
+    rect : tuple  (x, y, w, h)
+        Region divided into cells, in the coordinates of ``points``.
+    shape : tuple  (rows, cols)
+    axis : str
+        One of COMPONENTS.
+    method, max_iter : as in ``compensate_motion``.
+
+    Returns
+    -------
+    np.ndarray  (len(frames), rows * cols) float64, cells in row-major
+    order; NaN where a cell holds no feature (or positions are unknown)
+    """
+    if axis not in COMPONENTS:
+        raise ValueError(f"Unknown component: {axis}")
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation method: {method}")
+    rows, cols = shape
+    n_cells = rows * cols
+    x0, y0, w, h = rect
+
+    out = np.full((len(frames), n_cells), np.nan)
+    items = [f if isinstance(f, tuple) else (f,) for f in frames]
+    if any(len(item) < 2 for item in items):
+        raise ValueError("aggregate_grid needs (displacements, points) pairs")
+    present = [i for i, item in enumerate(items)
+               if item[0] is not None and item[1] is not None
+               and len(item[0]) > 0 and len(item[1]) == len(item[0])]
+    disps = {i: np.asarray(items[i][0]).reshape(-1, 2) for i in present}
+
+    for dtype in {d.dtype for d in disps.values()}:
+        group = [i for i in present if disps[i].dtype == dtype]
+        flat = np.concatenate([disps[i] for i in group])
+        points = np.concatenate([np.asarray(items[i][1], dtype=np.float64).reshape(-1, 2)
+                                 for i in group])
+        frame = np.repeat(np.arange(len(group)), [len(disps[i]) for i in group])
+        col = np.floor((points[:, 0] - x0) * cols / w)
+        row = np.floor((points[:, 1] - y0) * rows / h)
+        # NaN positions compare False and are dropped with the outside ones
+        inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        run = (frame * n_cells + row * cols + col)[inside].astype(np.int64)
+        # Stable, so each cell keeps its features in their original order
+        order = np.flatnonzero(inside)[np.argsort(run, kind="stable")]
+        counts = np.bincount(run, minlength=len(group) * n_cells)
+        occupied = counts > 0
+        if not occupied.any():
             continue
 
-        if axis == "magnitude":
-            vals = np.linalg.norm(frame_disp, axis=1)
-        else:
-            vals = frame_disp[:, axis_idx]
+        errors = inliers = None
+        if method != "mad":
+            errors, inliers = _gather(items, group, disps, 2), _gather(items, group, disps, 3)
+            errors = None if errors is None else errors[order]
+            inliers = None if inliers is None else inliers[order]
+        cells = np.full(len(group) * n_cells, np.nan)
+        cells[occupied] = _aggregate_group(flat[order], counts[occupied], points[order],
+                                           errors, inliers, (axis,), method, max_iter)[:, 0]
+        out[group] = cells.reshape(len(group), n_cells)
+    return out
+
+
+def _matching(values, disp, shape):
+    """Per-feature ``values`` for ``disp``, NaN when missing or mismatched."""
+    if values is None or len(values) != len(disp):
+        # e.g. the placeholder frame emitted when tracking is lost
+        return np.full((len(disp),) + shape, np.nan)
+    return np.asarray(values, dtype=np.float64).reshape((len(disp),) + shape)
+
 
-        # Median + MAD outlier rejection (robust to point-tracking noise)
-        median = np.median(vals)
-        mad = np.median(np.abs(vals - median))
+def _gather(items, group, disps, field):
+    """Per-feature item ``field`` over the frames in ``group``, None if no item has it."""
+    if not any(len(items[i]) > field for i in group):
+        return None
+    return np.concatenate([_matching(items[i][field] if len(items[i]) > field else None,
+                                     disps[i], ()) for i in group])
 
-        if mad < 1e-9:
-            signal.append(float(median))
+
+def _aggregate_group(flat, counts, points, errors, inliers, components, method, max_iter):
+    """
+    (F, C) components of F consecutive runs of ``flat`` (one dtype) of
+    length ``counts``; ``points`` are only used for rotation.
+    """
+    n = len(counts)
+    prior = _prior_weights(errors, inliers, counts)
+
+    def aggregate(vals, runs, weights):
+        if method == "mad":
+            return _aggregate_packed(vals, runs)
+        return _aggregate_irls(vals, runs, weights, method, max_iter)
+
+    # Translation components first, all rows sorted together
+    linear = [c for c in components if c != "rotation"]
+    if "rotation" in components:
+        linear += [c for c in ("x", "y") if c not in linear]
+    vals = [_component_values(flat, c) for c in linear]
+    result = aggregate(np.concatenate(vals), np.tile(counts, len(linear)),
+                       None if prior is None else np.tile(prior, len(linear)))
+    values = dict(zip(linear, result.reshape(len(linear), n)))
+
+    if "rotation" in components:
+        shift = np.column_stack([values["x"], values["y"]])
+        angles, kept, keep = _rotation_angles(flat, points, counts, shift)
+        rotation = np.zeros(n, dtype=np.float64)
+        if angles.size:
+            rotation[kept > 0] = aggregate(angles, kept[kept > 0],
+                                           None if prior is None else prior[keep])
+        values["rotation"] = rotation
+    return np.column_stack([values[c] for c in components])
+
+
+def _component_values(flat, axis):
+    if axis == "magnitude":
+        return np.linalg.norm(flat, axis=1)
+    return flat[:, {"x": 0, "y": 1}.get(axis, 1)]
+
+
+def _rotation_angles(flat, points, counts, shift, min_radius=0.5):
+    """
+    Per-feature small-angle rotation about each frame's features' centroid.
+
+    Features closer to the centroid than ``min_radius`` × the frame's RMS
+    radius are left out: their angle is mostly tracking noise.
+
+    Returns
+    -------
+    angles : np.ndarray  rotation of each kept feature (radians)
+    kept   : np.ndarray  (F,) features kept per frame
+    keep   : np.ndarray  (N,) bool mask of the kept features
+    """
+    disp = flat.astype(np.float64)
+    prev = points - disp
+    starts = np.cumsum(counts) - counts
+    centroid = np.add.reduceat(prev, starts) / counts[:, None]
+    r = prev - np.repeat(centroid, counts, axis=0)
+    d = disp - np.repeat(shift, counts, axis=0)
+    radius2 = np.einsum("ij,ij->i", r, r)
+    rms2 = np.add.reduceat(radius2, starts) / counts
+    # NaN radii (positions unknown) compare False and are dropped
+    keep = (radius2 > 0) & (radius2 >= min_radius ** 2 * np.repeat(rms2, counts))
+
+    angles = (r[keep, 0] * d[keep, 1] - r[keep, 1] * d[keep, 0]) / radius2[keep]
+    return angles, np.add.reduceat(keep, starts), keep
+
+
+def _pack(vals, counts, fill):
+    """Runs of ``vals`` as rows of a (len(counts), max count) block padded with ``fill``."""
+    valid = np.arange(counts.max()) < counts[:, None]
+    block = np.full(valid.shape, fill, dtype=vals.dtype)
+    block[valid] = vals
+    return block, valid
+
+
+def _aggregate_packed(vals, counts):
+    """Median/MAD-robust mean of consecutive runs of ``vals`` of length ``counts``."""
+    block, _ = _pack(vals, counts, np.inf)
+
+    median = _sorted_median(np.sort(block, axis=1), counts)
+    dev = np.abs(block - median[:, None])
+    mad = _sorted_median(np.sort(dev, axis=1), counts)
+    inliers = dev < 3.0 * mad[:, None]
+    inliers[mad < 1e-9] = False           # no spread: the median is returned
+
+    # Inliers moved to the front of their row in their original order, then
+    # averaged per inlier count: the same pairwise summation as a 1-D mean
+    kept = inliers.sum(axis=1)
+    packed = np.zeros_like(block)
+    packed[np.arange(block.shape[1]) < kept[:, None]] = block[inliers]
+    out = median.astype(np.float64)
+    for k in np.unique(kept[kept > 0]):
+        sel = np.flatnonzero(kept == k)
+        out[sel] = packed[sel, :k].mean(axis=1)
+
+    # NaN sorts after the padding; np.median returns NaN for those runs
+    out[np.logical_or.reduceat(np.isnan(vals), np.cumsum(counts) - counts)] = np.nan
+    return out
+
+
+def _prior_weights(errors, inliers, counts):
+    """IRLS prior weight of each feature from its error and inlier flag, or None."""
+    prior = None if errors is None else _error_weights(errors, counts)
+    if inliers is not None:
+        # Unknown (NaN) flags count as inliers
+        flags = np.where(inliers == 0, OUTLIER_WEIGHT, 1.0)
+        prior = flags if prior is None else prior * flags
+    return prior
+
+
+def _error_weights(errors, counts):
+    """
+    Prior weight 1 / (1 + (e / median e)^ERROR_WEIGHT_POWER) of each
+    feature from its tracking error ``e``, relative to the other features
+    of its frame.  Features without a usable error get weight 1.
+    """
+    known = np.isfinite(errors)
+    starts = np.cumsum(counts) - counts
+    n_known = np.add.reduceat(known, starts)
+    usable = n_known > 0
+    block, _ = _pack(np.where(known, errors, np.inf), counts, np.inf)
+    typical = np.ones(len(counts))
+    typical[usable] = _sorted_median(np.sort(block[usable], axis=1), n_known[usable])
+    typical = np.repeat(np.where(typical > 0, typical, 1.0), counts)
+    ratio = np.where(known, errors, 0.0) / typical
+    return 1.0 / (1.0 + ratio ** ERROR_WEIGHT_POWER)
+
+
+def _aggregate_irls(vals, counts, prior, method, max_iter, tol=1e-4):
+    """
+    Huber or Tukey-biweight M-estimate of each run by IRLS.
+
+    Starts from the (prior-weighted) median with 1.4826 × MAD about it as
+    the fixed scale.  Each iteration reweights every row of the padded
+    block at once; ``max_iter`` bounds the loop and it stops early once no
+    estimate moves by more than ``tol`` × its scale.  Rows without spread,
+    or whose weights all vanish, keep their starting value.
+    """
+    vals = vals.astype(np.float64)
+    block, valid = _pack(vals, counts, np.inf)
+    base = valid.astype(np.float64)
+    if prior is None:
+        start = _sorted_median(np.sort(block, axis=1), counts)
+    else:
+        base[valid] = prior
+        start = _weighted_median(block, base)
+    mad = _sorted_median(np.sort(np.abs(block - start[:, None]), axis=1), counts)
+    spread = mad >= 1e-9
+    scale = np.where(spread, 1.4826 * mad, 1.0)[:, None]
+
+    block[~valid] = 0.0
+    c = IRLS_TUNING[method]
+    estimate = start
+    for _ in range(max_iter):
+        u = np.abs(block - estimate[:, None]) / (c * scale)
+        if method == "huber":
+            w = 1.0 / np.maximum(u, 1.0)
         else:
-            inlier_mask = np.abs(vals - median) < 3.0 * mad
-            clean = vals[inlier_mask]
-            signal.append(float(np.mean(clean)) if len(clean) > 0 else float(median))
+            w = np.square(np.clip(1.0 - u * u, 0.0, None))
+        w *= base
+        total = w.sum(axis=1)
+        moved = (w * block).sum(axis=1) / np.where(total > 0, total, 1.0)
+        update = np.where(spread & (total > 0), moved, start)
+        converged = not np.any(np.abs(update - estimate) > tol * scale[:, 0])
+        estimate = update
+        if converged:
+            break
+
+    estimate[np.logical_or.reduceat(np.isnan(vals), np.cumsum(counts) - counts)] = np.nan
+    return estimate
+
+
+def _weighted_median(block, weights):
+    """Per-row weighted median of a padded block (padding sorts last, weight 0)."""
+    order = np.argsort(block, axis=1)
+    cum = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    pick = np.argmax(cum >= cum[:, -1:] / 2, axis=1)
+    return np.take_along_axis(block, np.take_along_axis(order, pick[:, None], axis=1),
+                              axis=1)[:, 0]
+
+
+def _sorted_median(sorted_block, counts):
+    """np.median of the first ``counts`` entries of each sorted row."""
+    idx = np.arange(len(counts))
+    lo = sorted_block[idx, (counts - 1) // 2]
+    hi = sorted_block[idx, counts // 2]
+    return np.where(counts % 2 == 1, hi, (lo + hi) / 2)
+
+
+def _as_signal(chunks, axis):
+    """Concatenated batch results; a structured array for several components."""
+    if isinstance(axis, str):
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+    dtype = np.dtype([(name, np.float64) for name in axis])
+    if not chunks:
+        return np.empty(0, dtype=dtype)
+    return recfunctions.unstructured_to_structured(np.concatenate(chunks), dtype=dtype)
+
+
+def aggregate_frame(frame_disp, axis="y"):
+    """Median/MAD-robust scalar displacement of a single frame."""
+    axis_idx = {"x": 0, "y": 1}.get(axis, 1)
+
+    if frame_disp is None or len(frame_disp) == 0:
+        return 0.0
+
+    if axis == "magnitude":
+        vals = np.linalg.norm(frame_disp, axis=1)
+    else:
+        vals = frame_disp[:, axis_idx]
+
+    # Median + MAD outlier rejection (robust to point-tracking noise)
+    median = np.median(vals)
+    mad = np.median(np.abs(vals - median))
+
+    if mad < 1e-9:
+        return float(median)
 
-    return np.array(signal, dtype=np.float64)
+    inlier_mask = np.abs(vals - median) < 3.0 * mad
+    clean = vals[inlier_mask]
+    return float(np.mean(clean)) if len(clean) > 0 else float(median)
@@ -0,0 +1,199 @@
+"""
+Motion Models — Camera-motion estimation for feature displacements
+==================================================================
+Fits the frame-to-frame camera motion that ``VibrationTracker`` removes
+from every feature's displacement.  Four models of increasing freedom
+are available:
+
+    translation  2 DOF  robust median shift (no RANSAC)
+    similarity   4 DOF  cv2.estimateAffinePartial2D (rotation + scale)
+    affine       6 DOF  cv2.estimateAffine2D
+    homography   8 DOF  cv2.findHomography
+
+A tripod mostly shakes by a small translation or rotation, which the
+cheap models explain as well as a full homography.  ``auto`` starts at
+translation and escalates only while too few points fit.  The previous
+frame's model can also be tried first as a prior: if it still explains
+most points it is refined by least squares on its inliers and RANSAC is
+skipped entirely.
+
+Every model is returned as a 3×3 matrix.
+"""
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+MODELS = ("translation", "similarity", "affine", "homography")
+MOTION_MODELS = MODELS + ("auto",)
+
+MotionFit = namedtuple("MotionFit", ["kind", "matrix", "inliers", "residual", "from_prior"])
+MotionFit.__doc__ = """
+kind       : str         model actually used
+matrix     : np.ndarray  (3, 3) float64 camera motion
+inliers    : np.ndarray  (N,) bool, points within the reprojection threshold
+residual   : float       RMS reprojection error (px) of the inliers
+from_prior : bool        refined from the previous frame's model (no RANSAC)
+"""
+
+
+# ---------------------------------------------------------------------------
+# Applying a model
+# ---------------------------------------------------------------------------
+
+def apply_model(kind, matrix, pts):
+    """Map (N, 2) points through a model; returns (N, 2) float32."""
+    pts = pts.reshape(-1, 2).astype(np.float32)
+    if kind == "homography":
+        return cv2.perspectiveTransform(pts.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+    return (pts @ matrix[:2, :2].T.astype(np.float32)
+            + matrix[:2, 2].astype(np.float32))
+
+
+def residuals(kind, matrix, src, dst):
+    """(N,) reprojection error of each point pair under a model."""
+    return np.linalg.norm(apply_model(kind, matrix, src) - dst, axis=1)
+
+
+# ---------------------------------------------------------------------------
+# Fitting
+# ---------------------------------------------------------------------------
+
+def _as_3x3(m):
+    out = np.eye(3)
+    out[: m.shape[0]] = m
+    return out
+
+
+def fit_robust(kind, src, dst, threshold=3.0, max_iters=2000):
+    """
+    Robust fit of one model; returns (matrix, inlier mask) or (None, None).
+    """
+    src = src.reshape(-1, 2).astype(np.float32)
+    dst = dst.reshape(-1, 2).astype(np.float32)
+
+    if kind == "translation":
+        shift = np.median(dst - src, axis=0)
+        m = np.eye(3)
+        m[:2, 2] = shift
+        inliers = residuals(kind, m, src, dst) < threshold
+        if inliers.any():
+            m[:2, 2] = (dst[inliers] - src[inliers]).mean(axis=0)
+        return m, inliers
+
+    if kind == "similarity":
+        m, mask = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC,
+                                              ransacReprojThreshold=threshold,
+                                              maxIters=max_iters)
+    elif kind == "affine":
+        m, mask = cv2.estimateAffine2D(src, dst, method=cv2.RANSAC,
+                                       ransacReprojThreshold=threshold,
+                                       maxIters=max_iters)
+    elif kind == "homography":
+        m, mask = cv2.findHomography(src.reshape(-1, 1, 2), dst.reshape(-1, 1, 2),
+                                     cv2.RANSAC, ransacReprojThreshold=threshold,
+                                     maxIters=max_iters)
+    else:
+        raise ValueError(f"Unknown motion model: {kind}")
+
+    if m is None:
+        return None, None
+    return _as_3x3(m), mask.ravel().astype(bool)
+
+
+def fit_least_squares(kind, src, dst):
+    """Plain least-squares fit (no outlier rejection); None if degenerate."""
+    src = src.reshape(-1, 2).astype(np.float64)
+    dst = dst.reshape(-1, 2).astype(np.float64)
+    m = np.eye(3)
+
+    if kind == "translation":
+        m[:2, 2] = (dst - src).mean(axis=0)
+        return m
+
+    if kind == "similarity":
+        # z' = a·z + b with complex a (rotation + scale) and b (shift)
+        z = src[:, 0] + 1j * src[:, 1]
+        w = dst[:, 0] + 1j * dst[:, 1]
+        zc, wc = z - z.mean(), w - w.mean()
+        denom = np.vdot(zc, zc).real
+        if denom <= 0:
+            return None
+        a = np.vdot(zc, wc) / denom
+        b = w.mean() - a * z.mean()
+        m[:2, :2] = [[a.real, -a.imag], [a.imag, a.real]]
+        m[:2, 2] = [b.real, b.imag]
+        return m
+
+    if kind == "affine":
+        design = np.column_stack([src, np.ones(len(src))])
+        sol, _, rank, _ = np.linalg.lstsq(design, dst, rcond=None)
+        if rank < 3:
+            return None
+        m[:2] = sol.T
+        return m
+
+    h, _ = cv2.findHomography(src.reshape(-1, 1, 2), dst.reshape(-1, 1, 2), 0)
+    return h
+
+
+def estimate_motion(src, dst, model="homography", threshold=3.0, max_iters=2000,
+                    prior=None, prior_min_inliers=0.7, escalate_inliers=0.5):
+    """
+    Estimate camera motion between matched point sets.
+
+    Parameters
+    ----------
+    src, dst : np.ndarray  (N, 2)
+        Point positions in the previous and current frame.
+    model : str
+        One of MODELS, or 'auto' to escalate translation → similarity →
+        affine → homography until ``escalate_inliers`` of points fit.
+        The structure itself moves against the camera, so a good camera
+        model does not have to explain every point.
+    threshold : float
+        Reprojection threshold (px) for inliers.
+    max_iters : int
+        RANSAC iteration cap.
+    prior : MotionFit or None
+        Previous frame's fit.  If it still explains ``prior_min_inliers``
+        of the points it is refined by least squares and RANSAC is skipped.
+
+    Returns
+    -------
+    MotionFit or None when no model could be estimated.
+    """
+    src = src.reshape(-1, 2).astype(np.float32)
+    dst = dst.reshape(-1, 2).astype(np.float32)
+
+    if prior is not None:
+        inliers = residuals(prior.kind, prior.matrix, src, dst) < threshold
+        if inliers.mean() >= prior_min_inliers:
+            m = fit_least_squares(prior.kind, src[inliers], dst[inliers])
+            if m is not None:
+                return _finish(prior.kind, m, src, dst, threshold, from_prior=True)
+
+    candidates = MODELS if model == "auto" else (model,)
+    fit = None
+    for kind in candidates:
+        m, inliers = fit_robust(kind, src, dst, threshold, max_iters)
+        if m is None:
+            continue
+        fit = MotionFit(kind, m, inliers, _rms(kind, m, src, dst, inliers), False)
+        if inliers.mean() >= escalate_inliers:
+            break
+    return fit
+
+
+def _rms(kind, m, src, dst, inliers):
+    if not inliers.any():
+        return float("nan")
+    r = residuals(kind, m, src[inliers], dst[inliers])
+    return float(np.sqrt(np.mean(r ** 2)))
+
+
+def _finish(kind, m, src, dst, threshold, from_prior):
+    inliers = residuals(kind, m, src, dst) < threshold
+    return MotionFit(kind, m, inliers, _rms(kind, m, src, dst, inliers), from_prior)
@@ -0,0 +1,184 @@
+"""
+Parallel Offline Tracking — Chunked multi-process VibrationTracker
+==================================================================
+Splits a video into frame ranges, tracks each range in its own process
+(seeking with CAP_PROP_POS_FRAMES) and stitches the per-frame results
+back together in order.
+
+Each chunk starts ``overlap`` frames early so its features are already
+warm when it reaches its first kept frame.  When ``overlap`` is at least
+``reinit_interval`` the chunk passes through the same periodic
+re-detection as a serial run, so the stitched output matches it.
+Replenishment (``reinit_mode='replenish'``) has no such period: the tracks
+alive at a chunk boundary depend on the whole history before it, so a
+chunk cannot reproduce them and that mode is rejected.
+Absolute displacements restart from zero in every chunk; each chunk is
+shifted so that, per ROI, its level at the first kept frame continues
+the previous chunk's.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from feature_tracker import TrackerOutputs, VibrationTracker, absolute_levels
+
+
+def probe_video(video_path):
+    """Return (fps, frame_count) for a video file."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return (fps if fps > 0 else 30.0), n_frames
+
+
+def plan_chunks(n_frames, chunk_frames, overlap):
+    """
+    Split frames 1..n_frames-1 (frame 0 is the reference) into chunks.
+
+    Returns
+    -------
+    list of (start, stop, keep_after) tuples:
+        the worker tracks frames [start, stop) and keeps results for frames
+        with index > keep_after.  The last chunk has stop=None (read to EOF),
+        which absorbs any error in the container's frame count.
+    """
+    bounds = list(range(0, max(n_frames - 1, 1), chunk_frames))
+    chunks = []
+    for i, keep_after in enumerate(bounds):
+        start = max(0, keep_after - overlap)
+        stop = bounds[i + 1] + 1 if i + 1 < len(bounds) else None
+        chunks.append((start, stop, keep_after))
+    return chunks
+
+
+class ParallelVibrationTracker(TrackerOutputs):
+    """
+    Drop-in replacement for VibrationTracker that tracks frame chunks in a
+    process pool.  Exposes the same ``run`` / ``iter_displacements`` /
+    ``iter_frames`` / ``iter_roi_displacements`` interface and ``fps`` attribute.
+    """
+
+    def __init__(self, video_path, workers=None, chunk_frames=1800, overlap=None,
+                 **tracker_kwargs):
+        """
+        Parameters
+        ----------
+        video_path : str
+            Path to input video file.
+        workers : int or None
+            Number of worker processes (default: os.cpu_count()).
+        chunk_frames : int
+            Frames per chunk.  Several chunks per worker keeps the pool busy
+            and bounds the memory held for out-of-order chunks.
+        overlap : int or None
+            Warm-up frames tracked before each chunk and then discarded
+            (default: the tracker's reinit_interval).
+        **tracker_kwargs
+            Forwarded to each chunk's VibrationTracker (roi, reinit_interval, ...);
+            ``reinit_mode`` must be 'full' and ``stride`` 1.
+        """
+        if tracker_kwargs.get("reinit_mode", "full") != "full":
+            raise ValueError("ParallelVibrationTracker requires reinit_mode='full': "
+                             "replenished tracks cannot be reproduced per chunk")
+        if tracker_kwargs.get("stride", 1) != 1:
+            raise ValueError("ParallelVibrationTracker requires stride=1: chunks do not "
+                             "follow the stride lattice and fps is not scaled by it")
+        self.video_path = video_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_frames = chunk_frames
+        self.tracker_kwargs = tracker_kwargs
+        if overlap is None:
+            overlap = tracker_kwargs.get("reinit_interval", 60)
+        self.overlap = overlap
+        self.fps = None
+        self.pipeline_stats = None     # per-process stats stay in the workers
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @property
+    def roi_names(self):
+        return VibrationTracker(self.video_path, **self.tracker_kwargs).roi_names
+
+    def cache_key_params(self):
+        params = VibrationTracker(self.video_path, **self.tracker_kwargs).cache_key_params()
+        params.update(chunk_frames=self.chunk_frames, overlap=self.overlap)
+        return params
+
+    def iter_frames(self):
+        """Yield ``TrackedFrame`` items in frame order as chunks complete."""
+        fps, n_frames = probe_video(self.video_path)
+        self.fps = fps
+        chunks = plan_chunks(n_frames, self.chunk_frames, self.overlap)
+
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                 initializer=_init_worker) as pool:
+            # Keep at most two chunks per worker in flight so finished but
+            # not-yet-consumed chunks cannot pile up in memory.
+            todo = deque(chunks)
+            in_flight = deque()
+            levels = {}
+            while todo or in_flight:
+                while todo and len(in_flight) < 2 * self.workers:
+                    start, stop, keep_after = todo.popleft()
+                    in_flight.append(pool.submit(
+                        _track_chunk, self.video_path, start, stop, keep_after,
+                        self.tracker_kwargs,
+                    ))
+                frames, chunk_levels = in_flight.popleft().result()
+                frames = _rebase_absolute(frames, chunk_levels, levels)
+                if frames:
+                    levels = absolute_levels(frames[-1].labels, frames[-1].absolute)
+                yield from frames
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _init_worker():
+    # One OpenCV thread per process: the pool already provides parallelism.
+    cv2.setNumThreads(1)
+
+
+def _track_chunk(video_path, start, stop, keep_after, tracker_kwargs):
+    """Frames after ``keep_after``, and the absolute levels at ``keep_after``."""
+    tracker = VibrationTracker(video_path, start_frame=start, end_frame=stop,
+                               **tracker_kwargs)
+    kept, levels = [], {}
+    for tracked in tracker.iter_frames():
+        if tracked.index > keep_after:
+            kept.append(tracked)
+        elif tracked.index == keep_after:
+            levels = absolute_levels(tracked.labels, tracked.absolute)
+    return kept, levels
+
+
+# ---------------------------------------------------------------------------
+# Stitching
+# ---------------------------------------------------------------------------
+
+def _rebase_absolute(frames, chunk_levels, levels):
+    """
+    Shift a chunk's absolute displacements so its per-ROI ``chunk_levels``
+    at the boundary frame land on the previous chunk's ``levels`` there.
+    """
+    shift = {k: levels[k] - level for k, level in chunk_levels.items() if k in levels}
+    if not shift:
+        return frames
+    rebased = []
+    for tracked in frames:
+        absolute = tracked.absolute.copy()
+        for k, delta in shift.items():
+            absolute[tracked.labels == k] += delta
+        rebased.append(tracked._replace(absolute=absolute))
+    return rebased
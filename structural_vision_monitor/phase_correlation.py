@@ -0,0 +1,135 @@
+"""
+Phase Correlation — Batched subpixel template tracking
+======================================================
+Tracks a handful of square patches at fixed image positions by FFT phase
+correlation, the same measurement as ``cv2.phaseCorrelate`` but for all
+patches in one batched transform:
+
+    - the Hanning window is built once for the patch size;
+    - each frame's patch spectra are kept and reused as the next frame's
+      reference, so every frame costs one forward and one inverse FFT
+      batch instead of two forward transforms per patch;
+    - the correlation peak is refined to subpixel precision by a 5×5
+      weighted centroid, as OpenCV does.
+
+For high-frame-rate cameras a few dozen patches replace hundreds of LK
+corners at a fraction of the cost.  Displacements are frame to frame, so
+the patches stay where they were placed; vibration amplitudes are small
+compared with the patch size.
+"""
+
+import cv2
+import numpy as np
+from scipy import fft
+
+
+def select_patches(gray, size, count, mask=None, min_distance=None):
+    """
+    Centres of up to ``count`` well-textured ``size``×``size`` patches.
+
+    Strongest Shi-Tomasi corners at least ``min_distance`` apart (default
+    half a patch), restricted to ``mask`` and to positions where the whole
+    patch fits in the image.
+
+    Returns
+    -------
+    np.ndarray  (N, 2) float32 patch centres
+    """
+    h, w = gray.shape[:2]
+    half = size // 2
+    fits = np.zeros((h, w), dtype=np.uint8)
+    fits[half : h - (size - half) + 1, half : w - (size - half) + 1] = 255
+    if mask is not None:
+        fits &= mask
+    pts = cv2.goodFeaturesToTrack(
+        gray, maxCorners=count, qualityLevel=0.01,
+        minDistance=min_distance or half, blockSize=7, mask=fits,
+    )
+    if pts is None:
+        return np.empty((0, 2), dtype=np.float32)
+    return pts.reshape(-1, 2).astype(np.float32)
+
+
+class PhaseCorrelator:
+    """Frame-to-frame shifts of fixed patches via batched phase correlation."""
+
+    def __init__(self, centres, size=64):
+        """
+        Parameters
+        ----------
+        centres : np.ndarray  (P, 2)
+            Patch centres in image coordinates (rounded to whole pixels).
+        size : int
+            Patch side in pixels; a power of two keeps the FFTs fast.
+        """
+        self.size = size
+        self.centres = np.asarray(centres, dtype=np.float32).reshape(-1, 2)
+        self._corners = (np.round(self.centres).astype(np.int64) - size // 2).tolist()
+        self._window = cv2.createHanningWindow((size, size), cv2.CV_32F)
+        # Reused every frame: windowed patches in, normalized cross-power out
+        self._patches = np.empty((len(self.centres), size, size), dtype=np.float32)
+        self._prev = None
+        # Offsets of the centroid neighbourhood around each peak
+        self._dy, self._dx = np.mgrid[-2:3, -2:3]
+
+    def __len__(self):
+        return len(self.centres)
+
+    def reset(self, gray):
+        """Take ``gray`` as the reference frame."""
+        self._prev = self._spectra(gray)
+
+    def update(self, gray):
+        """
+        Shift of each patch from the reference frame to ``gray``, which
+        then becomes the reference.
+
+        Returns
+        -------
+        shifts   : np.ndarray  (P, 2) float32 (dx, dy) in pixels
+        response : np.ndarray  (P,) float32 normalized peak height in [0, 1];
+                   low values mean an unreliable match
+        """
+        spectra = self._spectra(gray)
+        if self._prev is None:
+            self._prev = spectra
+            return (np.zeros((len(self), 2), dtype=np.float32),
+                    np.ones(len(self), dtype=np.float32))
+
+        cross = np.conj(self._prev, out=self._prev)
+        cross *= spectra
+        cross /= np.maximum(np.abs(cross), 1e-12)
+        surface = fft.irfft2(cross, s=(self.size, self.size), axes=(-2, -1),
+                             overwrite_x=True)
+        self._prev = spectra
+        return self._peaks(surface)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _spectra(self, gray):
+        s = self.size
+        for patch, (x, y) in zip(self._patches, self._corners):
+            np.multiply(gray[y : y + s, x : x + s], self._window, out=patch)
+        return fft.rfft2(self._patches, axes=(-2, -1))
+
+    def _peaks(self, surface):
+        n, s = len(surface), self.size
+        flat = surface.reshape(n, -1).argmax(axis=1)
+        py, px = np.divmod(flat, s)
+
+        # 5×5 weighted centroid around the peak, wrapping at the borders
+        rows = (py[:, None, None] + self._dy) % s
+        cols = (px[:, None, None] + self._dx) % s
+        hood = surface[np.arange(n)[:, None, None], rows, cols]
+        total = hood.sum(axis=(1, 2))
+        safe = np.where(total > 0, total, 1.0)
+        fy = py + (hood * self._dy).sum(axis=(1, 2)) / safe
+        fx = px + (hood * self._dx).sum(axis=(1, 2)) / safe
+
+        # Peaks past the middle are negative shifts
+        shifts = np.column_stack([fx, fy])
+        shifts = (shifts + s / 2) % s - s / 2
+        response = np.clip(total, 0.0, 1.0)
+        return shifts.astype(np.float32), response.astype(np.float32)
@@ -0,0 +1,191 @@
+"""
+Profiling — Per-stage timers for the tracking hot path
+======================================================
+``StageProfiler`` records how long each named stage takes (decode,
+cvtColor, calcOpticalFlowPyrLK, findHomography, ...) into a log-spaced
+histogram of durations, plus running statistics for per-frame values
+such as feature counts and RANSAC inlier ratios.
+
+Instrumented code always goes through a profiler; when it is disabled
+``stage()`` hands back a shared no-op context manager and ``observe()``
+returns immediately, so the cost is one attribute check per call.  The
+flag can be flipped at runtime (e.g. from the API) without restarting
+the pipeline.
+"""
+
+import contextlib
+import math
+import threading
+import time
+
+
+# Duration histogram: log-spaced bins, BINS_PER_OCTAVE per doubling; bin k
+# holds durations below 2**(k / BINS_PER_OCTAVE) microseconds.
+BINS_PER_OCTAVE = 4
+N_BINS = 32 * BINS_PER_OCTAVE
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def _edge_us(k):
+    return 2.0 ** (k / BINS_PER_OCTAVE)
+
+
+class _StageStats:
+    """Count, total, max and histogram of one stage's durations."""
+
+    __slots__ = ("count", "total", "max", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bins = [0] * N_BINS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        us = seconds * 1e6
+        k = int(math.log2(us) * BINS_PER_OCTAVE) + 1 if us >= 1 else 0
+        self.bins[min(k, N_BINS - 1)] += 1
+
+    def percentile(self, q):
+        """Upper bin edge (seconds) below which a fraction ``q`` of durations fall."""
+        target = q * self.count
+        seen = 0
+        for k, n in enumerate(self.bins):
+            seen += n
+            if seen >= target and n:
+                return min(_edge_us(k) * 1e-6, self.max)
+        return self.max
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(mean * 1e3, 4),
+            "p50_ms": round(self.percentile(0.50) * 1e3, 4),
+            "p95_ms": round(self.percentile(0.95) * 1e3, 4),
+            "max_ms": round(self.max * 1e3, 4),
+            "histogram_us": {f"<{_edge_us(k):.0f}": n for k, n in enumerate(self.bins) if n},
+        }
+
+
+class _ValueStats:
+    """Count, mean, min, max and last value of a per-frame quantity."""
+
+    __slots__ = ("count", "total", "min", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "min": round(self.min, 4) if self.count else None,
+            "max": round(self.max, 4) if self.count else None,
+            "last": self.last,
+        }
+
+
+class _Stage:
+    __slots__ = ("stats", "t0")
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter() - self.t0)
+
+
+class StageProfiler:
+    """Named stage timers and value statistics; cheap no-ops when disabled."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._values = {}
+        self.started_at = time.perf_counter()
+
+    def stage(self, name):
+        """Context manager timing one execution of stage ``name``."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self._get(self._stages, name, _StageStats))
+
+    def observe(self, name, value):
+        """Record one sample of a per-frame quantity (feature count, ratio, ...)."""
+        if self.enabled:
+            self._get(self._values, name, _ValueStats).add(value)
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._values = {}
+            self.started_at = time.perf_counter()
+
+    def summary(self):
+        """
+        Returns
+        -------
+        dict with keys:
+            - enabled: whether samples are being recorded
+            - wall_s: seconds since creation / last reset
+            - stages: {name: count, total_s, mean_ms, p50_ms, p95_ms,
+              max_ms, histogram_us}
+            - values: {name: count, mean, min, max, last}
+        """
+        with self._lock:
+            stages = dict(self._stages)
+            values = dict(self._values)
+        return {
+            "enabled": self.enabled,
+            "wall_s": round(time.perf_counter() - self.started_at, 3),
+            "stages": {name: s.summary() for name, s in stages.items()},
+            "values": {name: v.summary() for name, v in values.items()},
+        }
+
+    def format(self):
+        """Human-readable table of ``summary()``, stages sorted by total time."""
+        summary = self.summary()
+        lines = [f"{'stage':<24}{'calls':>8}{'total s':>10}{'mean ms':>10}"
+                 f"{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        stages = sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total_s"])
+        for name, s in stages:
+            lines.append(f"{name:<24}{s['count']:>8}{s['total_s']:>10.3f}{s['mean_ms']:>10.3f}"
+                         f"{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['max_ms']:>10.3f}")
+        for name, v in summary["values"].items():
+            lines.append(f"{name:<24}{v['count']:>8}  mean {v['mean']}  "
+                         f"min {v['min']}  max {v['max']}")
+        return "\n".join(lines)
+
+    def _get(self, table, name, factory):
+        stats = table.get(name)
+        if stats is None:
+            with self._lock:
+                stats = table.setdefault(name, factory())
+        return stats
+
+
+# Shared disabled profiler for code that was not given one
+NULL_PROFILER = StageProfiler(enabled=False)
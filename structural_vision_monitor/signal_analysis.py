@@ -1,5 +1,5 @@
 import numpy as np
-from scipy.fft import fft, fftfreq
+from scipy.fft import fft, fftfreq, rfft, rfftfreq
 from scipy.signal import butter, filtfilt, find_peaks, welch
 
 
@@ -38,6 +38,110 @@ def smooth_signal(signal, window=7):
     return np.convolve(signal, kernel, mode="same")
 
 
+# ---------------------------------------------------------------------------
+# Time base
+# ---------------------------------------------------------------------------
+
+def valid_timestamps(times):
+    """True if ``times`` are finite and strictly increasing (usable as a time base)."""
+    times = np.asarray(times, dtype=np.float64)
+    return len(times) >= 2 and bool(np.all(np.isfinite(times))) and bool(np.all(np.diff(times) > 0))
+
+
+def timestamps_uniform(times, tolerance=0.05):
+    """True if every frame interval is within ``tolerance`` of the median interval."""
+    dt = np.diff(np.asarray(times, dtype=np.float64))
+    if len(dt) == 0:
+        return True
+    median = np.median(dt)
+    return bool(np.all(np.abs(dt - median) <= tolerance * median))
+
+
+def resample_uniform(times, values, fps=None, cumulative=False):
+    """
+    Linearly resample samples taken at ``times`` onto a uniform grid.
+
+    Variable-frame-rate recordings and dropped frames leave irregular
+    sample times; FFT / Welch analysis assumes a constant rate.
+
+    Parameters
+    ----------
+    times : np.ndarray  (T,)
+        Strictly increasing sample times in seconds.
+    values : np.ndarray  (T,) or (T, K)
+        Samples; columns of a 2-D array are resampled together.
+    fps : float or None
+        Output rate; default the mean rate (T - 1) / duration.
+    cumulative : bool
+        ``values`` are per-frame increments (as produced by the tracker):
+        they are integrated to positions, resampled, and differenced back,
+        so an interval twice as long correctly carries twice the motion.
+
+    Returns
+    -------
+    resampled : np.ndarray  (T', ...) on the grid times[0] + k / fps
+    fps : float
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if fps is None:
+        fps = (len(times) - 1) / (times[-1] - times[0])
+    if cumulative:
+        values = np.cumsum(values, axis=0)
+
+    n = int(np.floor((times[-1] - times[0]) * fps + 1e-9)) + 1
+    grid = times[0] + np.arange(n) / fps
+    # Interval of each grid point and its linear weight, shared by all columns
+    j = np.clip(np.searchsorted(times, grid, side="right") - 1, 0, len(times) - 2)
+    w = (grid - times[j]) / (times[j + 1] - times[j])
+    w = w.reshape((-1,) + (1,) * (values.ndim - 1))
+    out = values[j] * (1.0 - w) + values[j + 1] * w
+
+    if cumulative:
+        out = np.diff(out, axis=0, prepend=np.zeros((1,) + out.shape[1:]))
+        out[0] = values[0]
+    return out, float(fps)
+
+
+def fill_missing(values):
+    """
+    Replace NaN samples of each column by that column's mean.
+
+    Grid cells briefly left without features (see
+    ``motion_compensation.aggregate_grid``) would otherwise spread
+    NaN through resampling and FFTs; columns with no samples at all stay NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    counts = (~missing).sum(axis=0)
+    totals = np.where(missing, 0.0, values).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+    return np.where(missing, means, values)
+
+
+def hold_missing(values):
+    """
+    Replace NaN samples by the last valid one before them (along axis 0).
+
+    Absolute displacement is a level, so a frame where an ROI had no
+    tracks keeps the previous level instead of dropping to zero; leading
+    NaN take the first valid sample, all-NaN columns stay NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    index = np.where(missing, 0, np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1)))
+    np.maximum.accumulate(index, axis=0, out=index)
+    held = np.take_along_axis(values, index, axis=0)
+    # Gaps at the start have nothing before them: take the first valid sample
+    first = np.argmax(~missing, axis=0)
+    return np.where(np.isnan(held), np.take_along_axis(values, first[None], axis=0), held)
+
+
 # ---------------------------------------------------------------------------
 # Frequency domain
 # ---------------------------------------------------------------------------
@@ -107,6 +211,82 @@ def top_n_frequencies(frequencies, magnitudes, n=5, min_hz=0.5, min_prominence=0
     return ranked[:n]
 
 
+def operating_deflection_shapes(signals, fps, frequencies):
+    """
+    Operating deflection shapes of a (T, cells) displacement field.
+
+    One real FFT along time transforms every cell at once; each shape is
+    the complex spectrum of all cells at the bin nearest an identified
+    frequency, divided by the coefficient of the cell moving most, so that
+    cell is 1 and the others carry their relative amplitude and phase.
+
+    Parameters
+    ----------
+    signals : np.ndarray  (T, cells)
+        e.g. ``aggregate_grid`` output; NaN samples are filled
+        with the cell's mean (see ``fill_missing``).
+    fps : float
+    frequencies : sequence of float
+        Frequencies (Hz) to extract, e.g. from ``top_n_frequencies``.
+
+    Returns
+    -------
+    bin_freqs  : np.ndarray  (K,) frequency of the FFT bin used for each
+    amplitudes : np.ndarray  (K, cells) single-sided amplitude per cell
+    shapes     : np.ndarray  (K, cells) complex normalized shape; NaN for
+                 cells that never held a feature
+    """
+    x = fill_missing(signals)
+    n = len(x)
+    spectra = rfft(x - x.mean(axis=0), axis=0)
+    bins = rfftfreq(n, 1.0 / fps)
+    idx = np.abs(bins[:, None] - np.asarray(frequencies, dtype=np.float64)).argmin(axis=0)
+
+    coeffs = spectra[idx]
+    amplitudes = np.abs(coeffs) * 2 / n
+    ref = np.where(np.isnan(amplitudes), -1.0, amplitudes).argmax(axis=1)
+    reference = coeffs[np.arange(len(idx)), ref][:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shapes = coeffs / reference
+    return bins[idx], amplitudes, shapes
+
+
+def aliasing_warning(fps, max_freq=None, source_fps=None, margin=0.8):
+    """
+    Warn when a decimated signal cannot resolve the requested band.
+
+    Skipping frames applies no anti-alias filter, so any structural motion
+    between the effective Nyquist frequency (fps / 2) and the source's
+    folds back into the spectrum.  Content should stay below ``margin`` of
+    Nyquist to be trusted.
+
+    Parameters
+    ----------
+    fps : float
+        Effective sampling rate of the signal.
+    max_freq : float or None
+        Highest frequency of interest (Hz); None only reports the limit.
+    source_fps : float or None
+        Rate before decimation; no warning when it equals ``fps``.
+
+    Returns
+    -------
+    str message, or None when the band is safe.
+    """
+    nyq = 0.5 * fps
+    decimated = source_fps is not None and source_fps > fps
+    if max_freq is not None and max_freq > margin * nyq:
+        msg = (f"Requested band up to {max_freq:g} Hz exceeds {margin:.0%} of the "
+               f"Nyquist frequency {nyq:g} Hz at {fps:g} fps")
+        if decimated:
+            msg += f"; lower the stride (source {source_fps:g} fps)"
+        return msg
+    if decimated and max_freq is None:
+        return (f"Decimated to {fps:g} fps: only modes below ~{margin * nyq:g} Hz are "
+                f"resolved; motion between {nyq:g} and {0.5 * source_fps:g} Hz aliases")
+    return None
+
+
 # ---------------------------------------------------------------------------
 # Damping estimation
 # ---------------------------------------------------------------------------
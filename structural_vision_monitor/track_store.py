@@ -0,0 +1,280 @@
+"""
+Track Store — Per-feature time histories in compact array form
+==============================================================
+Keeps every tracked feature under its stable track id and stores its
+position, validity and LK error in preallocated float32 NumPy arrays
+instead of per-frame Python lists.
+
+Storage is split into time blocks of ``block_frames`` frames.  Each block
+is a dense (frames × tracks × 2) array over only the tracks alive in that
+block, grown in ``chunk_tracks`` steps, so memory follows the number of
+live tracks rather than every id ever created.  Stores are exported to a
+single ``.npz`` or to a directory of ``.npy`` files that ``load`` can
+memory-map.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+_ARRAYS = ("frames", "times", "ids", "positions", "valid", "errors")
+
+# fill value, dtype and trailing shape of the per-(frame, track) arrays
+_FILL = {
+    "positions": (np.nan, np.float32, (2,)),
+    "valid": (False, bool, ()),
+    "errors": (np.nan, np.float32, ()),
+}
+
+
+def _lookup(sorted_ids, ids):
+    """(present mask, column index) of ``ids`` within ascending ``sorted_ids``."""
+    cols = np.searchsorted(sorted_ids, ids)
+    present = cols < len(sorted_ids)
+    present[present] = sorted_ids[cols[present]] == ids[present]
+    return present, cols
+
+
+class _TrackBlock:
+    """Dense storage for up to ``n_frames_cap`` consecutive frames."""
+
+    def __init__(self, n_frames_cap, chunk_tracks):
+        self.chunk_tracks = chunk_tracks
+        self.n_frames = 0
+        self.n_tracks = 0
+        self.frames = np.zeros(n_frames_cap, dtype=np.int64)
+        self.times = np.full(n_frames_cap, np.nan)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.full((n_frames_cap, 0, 2), np.nan, dtype=np.float32)
+        self.valid = np.zeros((n_frames_cap, 0), dtype=bool)
+        self.errors = np.full((n_frames_cap, 0), np.nan, dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        block = cls.__new__(cls)
+        block.chunk_tracks = 0
+        for name in _ARRAYS:
+            setattr(block, name, arrays[name])
+        block.n_frames = len(block.frames)
+        block.n_tracks = len(block.ids)
+        return block
+
+    @property
+    def full(self):
+        return self.n_frames == len(self.frames)
+
+    def append(self, frame_index, ids, points, errors, timestamp):
+        cols = self._columns(ids)
+        t = self.n_frames
+        self.frames[t] = frame_index
+        if timestamp is not None:
+            self.times[t] = timestamp
+        self.positions[t, cols] = points
+        self.valid[t, cols] = True
+        if errors is not None:
+            self.errors[t, cols] = errors
+        self.n_frames += 1
+
+    def trimmed(self):
+        """Views of the filled part of every array."""
+        t, n = self.n_frames, self.n_tracks
+        return {
+            "frames": self.frames[:t],
+            "times": self.times[:t],
+            "ids": self.ids[:n],
+            "positions": self.positions[:t, :n],
+            "valid": self.valid[:t, :n],
+            "errors": self.errors[:t, :n],
+        }
+
+    def _columns(self, ids):
+        """Column index of each id, adding columns for unseen ids."""
+        known = self.ids[: self.n_tracks]
+        hit, cols = _lookup(known, ids)
+        if hit.all():
+            return cols
+
+        # Sorted, so the merged ids only need a full re-sort when they interleave
+        new_ids = np.sort(ids[~hit])
+        self._reserve(self.n_tracks + len(new_ids))
+        self.ids[self.n_tracks : self.n_tracks + len(new_ids)] = new_ids
+        self.n_tracks += len(new_ids)
+        if len(known) and new_ids.min() < known[-1]:
+            self._sort_columns()
+        return np.searchsorted(self.ids[: self.n_tracks], ids)
+
+    def _reserve(self, n_tracks):
+        cap = self.positions.shape[1]
+        if n_tracks <= cap:
+            return
+        new_cap = cap + self.chunk_tracks * int(np.ceil((n_tracks - cap) / self.chunk_tracks))
+        extra = new_cap - cap
+        t = len(self.frames)
+        self.ids = np.concatenate([self.ids, np.zeros(new_cap - len(self.ids), dtype=np.int64)])
+        self.positions = np.concatenate(
+            [self.positions, np.full((t, extra, 2), np.nan, dtype=np.float32)], axis=1)
+        self.valid = np.concatenate([self.valid, np.zeros((t, extra), dtype=bool)], axis=1)
+        self.errors = np.concatenate(
+            [self.errors, np.full((t, extra), np.nan, dtype=np.float32)], axis=1)
+
+    def _sort_columns(self):
+        n = self.n_tracks
+        order = np.argsort(self.ids[:n], kind="stable")
+        self.ids[:n] = self.ids[:n][order]
+        self.positions[:, :n] = self.positions[:, :n][:, order]
+        self.valid[:, :n] = self.valid[:, :n][:, order]
+        self.errors[:, :n] = self.errors[:, :n][:, order]
+
+
+class TrackStore:
+    """Time histories of every tracked feature, keyed by stable track id."""
+
+    def __init__(self, block_frames=1024, chunk_tracks=256):
+        """
+        Parameters
+        ----------
+        block_frames : int
+            Frames per dense storage block.
+        chunk_tracks : int
+            Columns added at a time when a block sees new track ids.
+        """
+        self.block_frames = block_frames
+        self.chunk_tracks = chunk_tracks
+        self.blocks = []
+        self.fps = None
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def append(self, frame_index, ids, points, errors=None, timestamp=None):
+        """
+        Add one frame.
+
+        Parameters
+        ----------
+        frame_index : int
+        ids : np.ndarray  (N,) int track ids
+        points : np.ndarray  (N, 2) positions
+        errors : np.ndarray or None  (N,) LK tracking error
+        timestamp : float or None  frame time in seconds
+        """
+        if not self.blocks or self.blocks[-1].full:
+            self.blocks.append(_TrackBlock(self.block_frames, self.chunk_tracks))
+        ids = np.asarray(ids, dtype=np.int64)
+        self.blocks[-1].append(frame_index, ids, points, errors, timestamp)
+
+    def record(self, frames):
+        """
+        Pass-through generator: stores every ``TrackedFrame`` from ``frames``
+        and yields it unchanged, so recording composes with streaming
+        consumers such as ``compensate_motion``.
+        """
+        for tracked in frames:
+            self.append(tracked.index, tracked.ids, tracked.points, tracked.errors,
+                        tracked.timestamp)
+            yield tracked
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @property
+    def n_frames(self):
+        return sum(b.n_frames for b in self.blocks)
+
+    def frame_indices(self):
+        frames = [b.trimmed()["frames"] for b in self.blocks]
+        return np.concatenate([np.zeros(0, dtype=np.int64)] + frames)
+
+    def frame_times(self):
+        """(T,) frame timestamps in seconds, NaN where unknown."""
+        times = [b.trimmed()["times"] for b in self.blocks]
+        return np.concatenate([np.zeros(0)] + times)
+
+    def track_ids(self):
+        """All track ids seen, ascending."""
+        ids = [b.trimmed()["ids"] for b in self.blocks]
+        return np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + ids))
+
+    def positions(self, ids):
+        """
+        Time histories of the given tracks.
+
+        Returns
+        -------
+        positions : np.ndarray  (T, len(ids), 2) float32, NaN where not tracked
+        valid     : np.ndarray  (T, len(ids)) bool
+        """
+        return self._gather("positions", ids), self._gather("valid", ids)
+
+    def errors(self, ids):
+        """(T, len(ids)) LK error histories, NaN where not tracked."""
+        return self._gather("errors", ids)
+
+    def _gather(self, name, ids):
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        fill, dtype, tail = _FILL[name]
+        out = [np.full((0, len(ids)) + tail, fill, dtype=dtype)]
+        for block in self.blocks:
+            arr = block.trimmed()
+            dst = np.full((len(arr["frames"]), len(ids)) + tail, fill, dtype=dtype)
+            present, cols = _lookup(arr["ids"], ids)
+            dst[:, present] = arr[name][:, cols[present]]
+            out.append(dst)
+        return np.concatenate(out)
+
+    # ------------------------------------------------------------------
+    # Export / import
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """
+        Write the store to ``path``.
+
+        A path ending in ``.npz`` produces one (uncompressed) archive;
+        any other path is created as a directory of ``.npy`` files that
+        ``load(path, mmap_mode='r')`` maps without reading into memory.
+        """
+        meta = {"fps": self.fps, "n_blocks": len(self.blocks),
+                "block_frames": self.block_frames}
+        if path.endswith(".npz"):
+            arrays = {"meta": np.array(json.dumps(meta))}
+            for i, block in enumerate(self.blocks):
+                for name, arr in block.trimmed().items():
+                    arrays[f"block{i:05d}_{name}"] = arr
+            np.savez(path, **arrays)
+            return
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        for i, block in enumerate(self.blocks):
+            for name, arr in block.trimmed().items():
+                np.save(os.path.join(path, f"block{i:05d}_{name}.npy"), arr)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Load a store written by ``save`` (directories are memory-mapped)."""
+        if path.endswith(".npz"):
+            data = np.load(path)
+            meta = json.loads(str(data["meta"]))
+
+            def get(i, name):
+                key = f"block{i:05d}_{name}"
+                return data[key] if key in data.files else None
+        else:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+
+            def get(i, name):
+                fpath = os.path.join(path, f"block{i:05d}_{name}.npy")
+                return np.load(fpath, mmap_mode=mmap_mode) if os.path.exists(fpath) else None
+
+        store = cls(block_frames=meta["block_frames"])
+        store.fps = meta["fps"]
+        for i in range(meta["n_blocks"]):
+            store.blocks.append(_TrackBlock.from_arrays({n: get(i, n) for n in _ARRAYS}))
+        return store
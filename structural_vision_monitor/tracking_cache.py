@@ -0,0 +1,319 @@
+"""
+Tracking Cache — On-disk reuse of tracked frames between runs
+=============================================================
+Tracking is by far the most expensive stage of the offline pipeline, yet
+changing ``--cutoff``, ``--scale`` or ``--method`` only affects what
+happens after it.  ``TrackingCache`` stores every ``TrackedFrame`` of a
+run under a key derived from the video's content and the tracker's
+parameters, and replays it from memory-mapped arrays on later runs.
+
+Each entry is a directory holding one flat binary file per field plus
+per-frame row counts (CSR layout), so frames of any feature count are
+stored without padding.  The same frame log backs tracking checkpoints
+(see checkpoint.py).  Entries are written to a temporary directory and
+renamed into place only once the whole video has been tracked, so an
+interrupted run never leaves a partial entry behind.  The cache directory
+is kept under ``max_bytes`` by evicting least-recently-used entries;
+temporary directories count toward it, and those left by a killed run
+are removed once they have been idle for ``STALE_TEMP_SECONDS``.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from feature_tracker import TrackedFrame, TrackerOutputs
+
+
+CACHE_VERSION = 5
+
+# TrackedFrame array fields: dtype and trailing shape of one row
+_FIELDS = {
+    "displacements": (np.float32, (2,)),
+    "points": (np.float32, (2,)),
+    "labels": (np.int32, ()),
+    "ids": (np.int64, ()),
+    "errors": (np.float32, ()),
+    "absolute": (np.float32, (2,)),
+    "inliers": (np.bool_, ()),
+}
+_LOG_FILES = ("index", "times", "counts") + tuple(_FIELDS)
+
+# A store() temporary directory untouched this long belongs to a dead run
+STALE_TEMP_SECONDS = 3600
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def _last_modified(path):
+    return max(
+        [os.path.getmtime(path)]
+        + [os.path.getmtime(os.path.join(root, name))
+           for root, _, files in os.walk(path) for name in files]
+    )
+
+
+class FrameLogWriter:
+    """
+    Appends ``TrackedFrame`` items to a directory of flat binary files:
+    ``index.bin`` (frame numbers), ``times.bin`` (timestamps, NaN when
+    unknown), ``counts.bin`` (rows per frame and field) and one
+    ``<field>.bin`` per array field.
+    """
+
+    def __init__(self, path, lengths=None):
+        """
+        Parameters
+        ----------
+        path : str
+            Directory to write into (created if missing).
+        lengths : dict or None
+            Byte length of each file from ``lengths()``; existing files are
+            truncated to it and appended to (resume after a crash).
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.files = {}
+        for name in _LOG_FILES:
+            fpath = os.path.join(path, f"{name}.bin")
+            if lengths is None:
+                self.files[name] = open(fpath, "wb")
+            else:
+                f = open(fpath, "r+b")
+                f.truncate(lengths[name])
+                f.seek(0, os.SEEK_END)
+                self.files[name] = f
+
+    def append(self, tracked):
+        counts = np.zeros(len(_FIELDS), dtype=np.int64)
+        for i, (name, (dtype, _)) in enumerate(_FIELDS.items()):
+            arr = np.ascontiguousarray(getattr(tracked, name), dtype=dtype)
+            arr.tofile(self.files[name])
+            counts[i] = len(arr)
+        np.array([tracked.index], dtype=np.int64).tofile(self.files["index"])
+        timestamp = np.nan if tracked.timestamp is None else tracked.timestamp
+        np.array([timestamp], dtype=np.float64).tofile(self.files["times"])
+        counts.tofile(self.files["counts"])
+
+    def lengths(self):
+        return {name: f.tell() for name, f in self.files.items()}
+
+    def flush(self, sync=False):
+        for f in self.files.values():
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class FrameLogReader:
+    """Replays the frames of a ``FrameLogWriter`` directory through memory maps."""
+
+    def __init__(self, path, n_frames=None):
+        """
+        Parameters
+        ----------
+        path : str
+        n_frames : int or None
+            Read only the first ``n_frames`` frames (default: all).
+        """
+        self.path = path
+        if n_frames is None:
+            n_frames = os.path.getsize(os.path.join(path, "index.bin")) // 8
+        self.index = self._map("index", np.int64, (n_frames,))
+        self.times = self._map("times", np.float64, (n_frames,))
+        counts = self._map("counts", np.int64, (n_frames, len(_FIELDS)))
+        offsets = np.zeros((n_frames + 1, len(_FIELDS)), dtype=np.int64)
+        np.cumsum(counts, axis=0, out=offsets[1:])
+        self._offsets = {}
+        self._data = {}
+        for i, (name, (dtype, tail)) in enumerate(_FIELDS.items()):
+            self._offsets[name] = offsets[:, i]
+            self._data[name] = self._map(name, dtype, (int(offsets[-1, i]),) + tail)
+
+    def __len__(self):
+        return len(self.index)
+
+    def iter_frames(self):
+        for i, index in enumerate(self.index):
+            fields = {
+                name: self._data[name][self._offsets[name][i]:self._offsets[name][i + 1]]
+                for name in _FIELDS
+            }
+            timestamp = None if np.isnan(self.times[i]) else float(self.times[i])
+            yield TrackedFrame(int(index), timestamp=timestamp, **fields)
+
+    def _map(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype,
+                         mode="r", shape=shape)
+
+
+class CacheEntry(FrameLogReader):
+    """A completed cache entry."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.fps = self.meta["fps"]
+        super().__init__(path, self.meta["frames"])
+
+
+class TrackingCache:
+    """Content-addressed store of tracking results with LRU eviction."""
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        """
+        Parameters
+        ----------
+        cache_dir : str
+            Directory holding one sub-directory per cached run.
+        max_bytes : int
+            Size bound for the whole directory; least-recently-used
+            entries are removed when a new entry pushes it over.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, video_path, params):
+        """Cache key for a video file and a dict of tracker parameters."""
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}\n".encode())
+        digest.update(hash_file(video_path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+        return digest.hexdigest()[:32]
+
+    def load(self, key):
+        """Return the ``CacheEntry`` for ``key`` or None, marking it recently used."""
+        path = os.path.join(self.cache_dir, key)
+        meta = os.path.join(path, "meta.json")
+        if not os.path.exists(meta):
+            return None
+        os.utime(meta)
+        return CacheEntry(path)
+
+    def store(self, key, frames, fps_source, params=None):
+        """
+        Pass-through generator that writes ``frames`` to the cache.
+
+        The entry is committed only if ``frames`` is exhausted; ``fps_source``
+        is read for its ``fps`` attribute at that point.
+        """
+        tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        writer = FrameLogWriter(tmp)
+        n_frames = 0
+        done = False
+        try:
+            for tracked in frames:
+                writer.append(tracked)
+                n_frames += 1
+                yield tracked
+            done = True
+        finally:
+            writer.close()
+            if done:
+                self._commit(tmp, key, n_frames, fps_source.fps, params)
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def evict(self, keep=()):
+        """
+        Remove least-recently-used entries until the cache fits ``max_bytes``.
+
+        Temporary directories of ``store`` count toward the size; those idle
+        for ``STALE_TEMP_SECONDS`` (the run was killed before its cleanup)
+        are removed.
+        """
+        entries, pending = [], 0
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") and os.path.isdir(path):
+                if now - _last_modified(path) > STALE_TEMP_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    pending += _dir_size(path)
+                continue
+            meta = os.path.join(path, "meta.json")
+            if os.path.exists(meta):
+                entries.append((os.path.getmtime(meta), _dir_size(path), name, path))
+        total = pending + sum(e[1] for e in entries)
+        for _, size, name, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name in keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _commit(self, tmp, key, n_frames, fps, params):
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"version": CACHE_VERSION, "fps": fps, "frames": n_frames,
+                       "params": params}, f, indent=2, default=repr)
+
+        final = os.path.join(self.cache_dir, key)
+        if os.path.exists(final):
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            os.replace(tmp, final)
+        self.evict(keep=(key,))
+
+
+class CachedTracker(TrackerOutputs):
+    """
+    Wraps a ``VibrationTracker`` or ``ParallelVibrationTracker`` so that
+    ``iter_frames`` replays a cached run when one exists and records one
+    otherwise.  Exposes the wrapped tracker's streaming interface.
+    """
+
+    def __init__(self, tracker, cache):
+        self.tracker = tracker
+        self.cache = cache
+        self.hit = False
+        self.fps = None
+
+    @property
+    def roi_names(self):
+        return self.tracker.roi_names
+
+    @property
+    def pipeline_stats(self):
+        """Decode/track stage stats of a fresh run; None when replayed from cache."""
+        return None if self.hit else getattr(self.tracker, "pipeline_stats", None)
+
+    def iter_frames(self):
+        params = self.tracker.cache_key_params()
+        key = self.cache.key(self.tracker.video_path, params)
+        entry = self.cache.load(key)
+        self.hit = entry is not None
+        if self.hit:
+            self.fps = entry.fps
+            yield from entry.iter_frames()
+            return
+
+        yield from self.cache.store(key, self.tracker.iter_frames(), self.tracker, params)
+        self.fps = self.tracker.fps